@@ -0,0 +1,209 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from app.config import settings
+from app.metrics import Collected, Counter, Histogram, registry
+
+# İstek kabul kontrolü kısmı (ADMISSION_LIMITS / CLIENT_RATE_LIMIT ile açılır)
+# - route başına eşzamanlılık sınırı: ADMISSION_LIMITS'te verilen route'larda aynı anda en fazla N istek çalışır,
+#   fazlası event loop'ta sınırlı bir kuyrukta bekler (threadpool thread'i veya bağlantı tutmadan)
+#   kuyruk doluysa istek hemen, ADMISSION_QUEUE_TARGET_MS'ten uzun beklediyse 503 + Retry-After ile reddedilir
+# - istemci başına token bucket: yazma istekleri (POST/PUT/PATCH/DELETE) istemci adresi başına
+#   CLIENT_RATE_LIMIT/sn hızında, CLIENT_RATE_BURST'e kadar birikerek kabul edilir, aşan istek 429 döner
+# yazmalar SQLite kilidinde doyduğunda sınırlı route'lar kendi kuyruğunda reddedilir, okumalar beklemez
+# ayarlar boşken middleware isteği doğrudan geçirir
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# token bucket tutulan en fazla istemci sayısı; en uzun süredir görülmeyen istemcinin kovası atılır
+# (atılan kova zaten dolmuş olacağı için yeniden oluşturulması davranışı değiştirmez)
+MAX_CLIENTS = 10000
+
+REJECTED = registry.register(Counter(
+    "admission_rejected_total", "Kabul kontrolünce reddedilen istek sayısı", ("route", "reason")))
+QUEUE_WAIT = registry.register(Histogram(
+    "admission_queue_wait_seconds", "İsteğin route kuyruğunda çalışmak için beklediği süre", ("route",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, detail: str, retry_after: int):
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+# ADMISSION_LIMITS: "POST /orders/=4:32,POST /reviews/=4:32" (METHOD route şablonu=eşzamanlı:kuyruk)
+def parse_limits(raw: str) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    limits = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        route, _, limit = item.partition("=")
+        method, _, path = route.strip().partition(" ")
+        concurrency, _, queue = limit.partition(":")
+        if not path.strip() or not concurrency.strip():
+            raise ValueError(f"Geçersiz kabul sınırı: {item.strip()}")
+        limits[(method.upper(), path.strip())] = (int(concurrency), int(queue or 0))
+    return limits
+
+
+# Event loop'ta kullanılır (kilit yoktur); boşalan yer kuyruktaki ilk isteğe devredilir
+class Limiter:
+    def __init__(self, concurrency: int, queue: int):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: Optional[float]) -> float:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.queue:
+            raise Rejected(503, "queue_full", "Sunucu yoğun, kuyruk dolu", 1)
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            # Python 3.12+'da yer aynı döngü turunda devredilmiş olsa da zaman aşımı kazanabilir; yer geri bırakılır
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise Rejected(503, "queue_timeout", "Sunucu yoğun, kuyruk bekleme süresi aşıldı",
+                           max(1, math.ceil(timeout))) from None
+        except BaseException:
+            # yer devredildikten sonra iptal edilen istek (bağlantı koptu) yeri bir sonrakine bırakır
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return time.perf_counter() - started
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # active değişmez, yer doğrudan bekleyene geçer
+                return
+        self.active -= 1
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    # token alınabildiyse 0, alınamadıysa bir token birikene kadar beklenecek süre (sn) döner
+    def take(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._raw_limits: Optional[str] = None
+        self._limiters: Dict[Tuple[str, str], Limiter] = {}
+        self._routes: Optional[List[tuple]] = None
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        _middlewares.append(self)
+
+    # ayar değiştiyse (testlerde monkeypatch) sınırlar yeniden kurulur; route eşleme listesi ilk istekte oluşur
+    def _limited_routes(self, scope) -> List[tuple]:
+        if self._raw_limits != settings.admission_limits:
+            self._raw_limits = settings.admission_limits
+            self._limiters = {key: Limiter(*limit) for key, limit in parse_limits(self._raw_limits).items()}
+            self._routes = None
+        if self._routes is None:
+            self._routes = [(route, self._limiters[(method, route.path)])
+                            for route in scope["app"].router.routes
+                            for method in getattr(route, "methods", None) or ()
+                            if (method, route.path) in self._limiters]
+        return self._routes
+
+    # Sadece sınırı olan route'lar denenir, diğer isteklerde route eşleme maliyeti yoktur
+    def _match(self, scope):
+        for route, limiter in self._limited_routes(scope):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route, limiter
+        return None, None
+
+    def _check_rate(self, scope) -> None:
+        rate = settings.client_rate_limit
+        if rate <= 0 or scope["method"] not in WRITE_METHODS:
+            return
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(rate, settings.client_rate_burst, now)
+            if len(self._buckets) > MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket.rate, bucket.burst = rate, settings.client_rate_burst
+        wait = bucket.take(now)
+        if wait:
+            raise Rejected(429, "rate_limited", "Çok fazla istek", max(1, math.ceil(wait)))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (settings.admission_limits or settings.client_rate_limit > 0):
+            await self.app(scope, receive, send)
+            return
+        route, limiter = self._match(scope) if settings.admission_limits else (None, None)
+        template = route.path if route is not None else "unlimited"
+        try:
+            self._check_rate(scope)
+            if limiter is not None:
+                timeout = settings.admission_queue_target_ms / 1000 or None
+                QUEUE_WAIT.observe(await limiter.acquire(timeout), template)
+        except Rejected as rejected:
+            REJECTED.inc(template, rejected.reason)
+            if route is not None:
+                scope["route"] = route  # /metrics'te reddedilen istek de route şablonuyla sayılır
+            response = JSONResponse({"detail": rejected.detail}, status_code=rejected.status_code,
+                                    headers={"Retry-After": str(rejected.retry_after)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+
+_middlewares: List[AdmissionMiddleware] = []
+
+
+def _limiters():
+    for middleware in _middlewares:
+        for (method, path), limiter in middleware._limiters.items():
+            yield (path, method), limiter
+
+
+registry.register(Collected("admission_in_flight", "Sınırlı route'ta çalışan istek sayısı", "gauge",
+                            ("route", "method"), lambda: {key: limiter.active for key, limiter in _limiters()}))
+registry.register(Collected("admission_queue_depth", "Sınırlı route'un kuyruğunda bekleyen istek sayısı", "gauge",
+                            ("route", "method"), lambda: {key: limiter.depth() for key, limiter in _limiters()}))
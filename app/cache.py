@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+# crud katmanı için boyutu sınırlı LRU + TTL önbellek
+# FastAPI senkron endpointleri threadpool'da çalıştırdığı için tüm erişimler tek bir kilit ile korunur
+
+
+class EntityCache:
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # her yazma işleminde artar; okuma sırasında yazma olduysa eski değer önbelleğe konmaz
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # Veritabanından okunan değeri ekler, okuma başladıktan sonra bir yazma olduysa eklemez
+    def fill(self, key, value, epoch: int):
+        with self._lock:
+            if epoch == self.epoch:
+                self._store(key, value)
+
+    # Yazma işlemlerinden sonra güncel değeri doğrudan önbelleğe yazar
+    def put(self, key, value):
+        with self._lock:
+            self.epoch += 1
+            self._store(key, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.epoch += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _store(self, key, value):
+        self._data[key] = (value, self._clock() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
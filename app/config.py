@@ -0,0 +1,78 @@
+import os
+from dataclasses import dataclass, fields
+
+# Uygulama ayarları burada toplanır
+# her alan aynı isimli büyük harfli ortam değişkeni ile değiştirilebilir (örn. ENTITY_CACHE_ENABLED=1)
+
+
+def _parse(raw: str, kind):
+    if kind is bool:
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    return kind(raw)
+
+
+@dataclass
+class Settings:
+    # veritabanı adresi ve engine profili (default veya production: WAL, PRAGMA'lar ve okuma/yazma ayrımı)
+    database_url: str = "sqlite:///./test.db"
+    database_profile: str = "default"
+    # profilin PRAGMA'larını ezer: "cache_size=-20000,mmap_size=0"
+    sqlite_pragmas: str = ""
+    # production profilinde GET route'larının kullandığı salt okunur havuzun bağlantı sayısı
+    read_pool_size: int = 8
+    # async okuma route'larının veritabanı executor'ı: thread sayısı (0 ise READ_POOL_SIZE), kuyruk sınırı ve
+    # bir işin başlamadan bekleyebileceği en uzun süre (ms, 0 ise sınırsız); sınırı aşan istek 503 döner
+    db_executor_workers: int = 0
+    db_executor_max_queue: int = 1000
+    db_executor_max_wait_ms: float = 0.0
+    # crud katmanındaki product/category/user önbelleği
+    entity_cache_enabled: bool = False
+    entity_cache_size: int = 10000
+    entity_cache_ttl: float = 60.0
+    # listeleme endpointlerinde ORM nesnesi ve response_model doğrulaması yerine satırlardan doğrudan JSON üretimi
+    fast_serialization: bool = False
+    # ?ids=1,5,9 ile tek istekte okunabilecek en fazla kayıt sayısı
+    max_ids_per_request: int = 100
+    # ürün fiyat facet'lerinin alt sınırları (virgülle ayrılır, son aralık üstten açıktır)
+    # değiştirilirse facet tablosu yeniden oluşturulmalıdır
+    facet_price_buckets: str = "0,100,500,1000,5000"
+    # dışa aktarımda veritabanından tek seferde çekilen satır sayısı (bellek kullanımı buna bağlıdır)
+    export_chunk_size: int = 1000
+    # içe aktarımda tek transaction ile eklenen kayıt sayısı, kesilen iş son commit edilen parçadan devam eder
+    import_chunk_size: int = 1000
+    # sipariş ve yorum eklemeleri tek writer thread'inde toplanıp birlikte commit edilir
+    group_commit_enabled: bool = False
+    # writer ilk işten sonra bu kadar (ms) daha iş bekler veya batch bu boyuta ulaşınca commit eder
+    group_commit_window_ms: float = 2.0
+    group_commit_max_batch: int = 64
+    # istek kabul kontrolü: route başına eşzamanlı çalışan ve kuyrukta bekleyebilen istek sayısı
+    # "POST /orders/=4:32,POST /reviews/=4:32" (METHOD route şablonu=eşzamanlı:kuyruk); boşsa sınır yoktur
+    admission_limits: str = ""
+    # kuyrukta bu süreden (ms) uzun bekleyen istek 503 ile reddedilir (0 ise kuyruk sınırına kadar beklenir)
+    admission_queue_target_ms: float = 100.0
+    # istemci adresi başına yazma isteği token bucket'ı: saniyede eklenen token (0 ise kapalı) ve kova boyutu
+    client_rate_limit: float = 0.0
+    client_rate_burst: int = 20
+    # istek başına sorgu sayısı/süresi (Server-Timing, X-DB-Queries) ve yavaş sorgu logu
+    sql_instrumentation: bool = False
+    # bu süreyi (ms) aşan sorgular app.sql logger'ına yazılır
+    slow_query_ms: float = 100.0
+    # istek profili: X-Profile header'ı bu değerle gelirse istek cProfile ile ölçülür (boşsa header ile tetiklenmez)
+    profile_token: str = ""
+    # isteklerin bu oranı (0-1) rastgele seçilip profillenir
+    profile_sample_rate: float = 0.0
+    # profil kayıtlarının yazıldığı dizin ve tutulacak en fazla kayıt sayısı
+    profile_dir: str = "profiles"
+    profile_keep: int = 50
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(field.name.upper())
+            if raw is not None:
+                values[field.name] = _parse(raw, field.type)
+        return cls(**values)
+
+
+settings = Settings.from_env()
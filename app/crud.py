@@ -1,79 +1,459 @@
-from sqlalchemy.orm import Session
+import re
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from app import models, schemas
+from app.cache import EntityCache
+from app.config import settings
+from app.fields import Selection
 
 # Veri tabanı üstündeki temel işlemleri (CRUD)  gerçekleşmektedir
 # ekleme, okuma, güncelleme, silme, listeleme vb. işlemler 
+
+# product, category ve user kayıtları için süreç içi önbellek (ENTITY_CACHE_ENABLED ile açılır)
+# anahtar (model, id) şeklindedir, değer olarak oturumdan bağımsız pydantic kopyası tutulur
+entity_cache = EntityCache(max_size=settings.entity_cache_size, ttl=settings.entity_cache_ttl)
+
+def _cached_get(model, schema, entity_id, load):
+    if not settings.entity_cache_enabled:
+        return load()
+    key = (model, entity_id)
+    cached = entity_cache.get(key)
+    if cached is not None:
+        return cached
+    epoch = entity_cache.epoch
+    row = load()
+    if row is None:
+        return None
+    snapshot = schema.model_validate(row) if schema is not None else row
+    entity_cache.fill(key, snapshot, epoch)
+    return snapshot
+
+# Sadece önbelleğe bakar, veritabanına gitmez (async route'lar isabeti event loop'ta döner, ıskada None)
+def _peek(model, entity_id):
+    if not settings.entity_cache_enabled:
+        return None
+    return entity_cache.get((model, entity_id))
+
+def cached_user(user_id: int) -> Optional[schemas.User]:
+    return _peek(models.User, user_id)
+
+def cached_category(category_id: int) -> Optional[schemas.Category]:
+    return _peek(models.Category, category_id)
+
+def cached_product(product_id: int) -> Optional[schemas.Product]:
+    return _peek(models.Product, product_id)
+
+def cached_table_version(table_name: str) -> Optional[int]:
+    return _peek(models.TableVersion, table_name)
+
+# Çoklu okuma: önbellekte olmayanlar tek bir IN sorgusu ile okunur, sonuç istenen sırada döner
+def _get_many(db: Session, model, schema, ids: List[int]):
+    found = {}
+    if settings.entity_cache_enabled and schema is not None:
+        for entity_id in ids:
+            cached = entity_cache.get((model, entity_id))
+            if cached is not None:
+                found[entity_id] = cached
+    pending = [entity_id for entity_id in ids if entity_id not in found]
+    if pending:
+        epoch = entity_cache.epoch
+        for row in db.query(model).filter(model.id.in_(pending)):
+            if settings.entity_cache_enabled and schema is not None:
+                snapshot = schema.model_validate(row)
+                entity_cache.fill((model, row.id), snapshot, epoch)
+                found[row.id] = snapshot
+            else:
+                found[row.id] = row
+    return [found[entity_id] for entity_id in ids if entity_id in found]
+
+def _cache_put(model, schema, row):
+    if settings.entity_cache_enabled:
+        entity_cache.put((model, row.id), schema.model_validate(row))
+
+
+# Tablo değişiklik sayaçları (ETag için)
+# yazma işlemleri commit'ten hemen önce etkilenen tabloların sayacını aynı transaction içinde artırır
+# grup commit içindeyken (begin_group) commit yapılmaz: değişiklikler flush edilir, tablolar toplanır ve
+# sayaçlar commit_group ile batch sonunda bir kez artırılır
+GROUP_TABLES = "group_commit_tables"
+
+def _commit(db: Session, *tables: str):
+    pending = db.info.get(GROUP_TABLES)
+    if pending is not None:
+        pending.update(tables)
+        db.flush()
+        return
+    statement = sqlite_insert(models.TableVersion).values([{"table_name": t, "version": 1} for t in tables])
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.TableVersion.table_name],
+        set_={"version": models.TableVersion.version + 1},
+    )
+    db.execute(statement)
+    db.commit()
+    for table in tables:
+        entity_cache.invalidate((models.TableVersion, table))
+
+# Writer bağlantısında yazma kilidi baştan alınır (BEGIN IMMEDIATE); pysqlite DML'den önce transaction
+# açmadığı için bu olmadan ilk SAVEPOINT'in RELEASE'i kendi başına commit olurdu
+def begin_group(db: Session):
+    db.info[GROUP_TABLES] = set()
+    db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+def commit_group(db: Session):
+    tables = db.info.pop(GROUP_TABLES)
+    if tables:
+        _commit(db, *sorted(tables))
+    else:
+        db.commit()
+
+def get_table_version(db: Session, table_name: str) -> int:
+    return _cached_get(models.TableVersion, None, table_name, lambda: db.query(models.TableVersion.version)
+                       .filter(models.TableVersion.table_name == table_name).scalar() or 0)
+
+
+# Özet tablolar için sayaç artırma: satır yoksa eklenir, varsa değerler mevcut sayaçların üzerine eklenir
+# tüm satırlar tek bir çok satırlı upsert ile yazılır
+def _increment(db: Session, model, key_columns: Sequence[str], rows: List[dict]):
+    if not rows:
+        return
+    columns = model.__table__.c
+    statement = sqlite_insert(model).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[columns[key] for key in key_columns],
+        set_={name: columns[name] + statement.excluded[name] for name in rows[0] if name not in key_columns},
+    )
+    db.execute(statement)
+
+
+# Tek ifadelik güncelleme/silme kısmı
+# UPDATE/DELETE ... RETURNING ile önce okuma yapılmaz, kayıt yoksa ifade satır döndürmez
+# PATCH isteklerinde sadece istemcinin gönderdiği alanlar (exclude_unset) güncellenir
+def _changes(model, update_data) -> dict:
+    values = update_data.model_dump(exclude_unset=True)
+    return {key: value for key, value in values.items()
+            if value is not None or model.__table__.c[key].nullable}
+
+def _update_returning(db: Session, model, entity_id: int, values: dict):
+    columns = model.__table__.c
+    if not values:
+        return db.query(*columns).filter(model.id == entity_id).first()
+    statement = update(model).where(model.id == entity_id).values(**values).returning(*columns)
+    return db.execute(statement).first()
+
+# silinen satırın istenen kolonları döner, kayıt yoksa None
+def _delete_returning(db: Session, model, entity_id: int, *columns):
+    statement = delete(model).where(model.id == entity_id).returning(model.id, *columns)
+    return db.execute(statement).first()
+
+
+# Listeleme sorgularında sayfalama kısmı
+# after verilirse keyset (id > after) kullanılır, verilmezse eski skip/limit davranışı korunur
+def _paginate(query, column, skip: int, limit: int, after: Optional[int] = None):
+    query = query.order_by(column)
+    if after is not None:
+        query = query.filter(column > after)
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+# Birden fazla kolona göre sıralanan listeler için keyset sayfalama
+# son kolon her zaman id'dir, after bu kolonların son satırdaki değerleridir
+def _keyset_page(query, columns: Sequence, skip: int, limit: int,
+                 after: Optional[Sequence] = None, descending: bool = False):
+    key = tuple_(*columns)
+    if descending:
+        query = query.order_by(*(column.desc() for column in columns))
+    else:
+        query = query.order_by(*columns)
+    if after is not None:
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+# Tam metin arama kısmı (FTS5)
+# aranan kelimeler tırnak içine alınıp önek araması yapılır, böylece FTS5 söz dizimi hatası oluşmaz
+# sonuçlar bm25 skoruna (rank) göre sıralanır, sayfalama (rank, id) üzerinden keyset ile yapılır
+def _fts_match(q: str) -> str:
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", q))
+
+def _search(db: Session, model, fts, text_column: str, q: str, limit: int, after: Optional[Sequence] = None):
+    match = _fts_match(q)
+    if not match:
+        return []
+    query = (db.query(model, fts.c.rank).join(fts, fts.c.rowid == model.id)
+             .filter(fts.c[text_column].match(match)))
+    if after is not None:
+        query = query.filter(tuple_(fts.c.rank, model.id) > tuple_(*after))
+    return query.order_by(fts.c.rank, model.id).limit(limit).all()
+
+
+# Dışa aktarım kısmı
+# satırlar ORM nesnesi ve pydantic modeli oluşturulmadan kolon olarak okunur
+# yield_per ile sonuç sabit boyutlu parçalar halinde çekilir, bellek kullanımı toplam satır sayısına bağlı değildir
+def _export(db: Session, statement, chunk_size: Optional[int] = None):
+    return db.execute(statement.execution_options(yield_per=chunk_size or settings.export_chunk_size))
+
+# Hızlı serileştirme için satır okuma
+# rows=True verilen listeleme fonksiyonları ORM nesnesi yerine kolon adı -> değer sözlükleri döner
+# sorgu aynı kalır (filtre, sıralama, sayfalama), sadece seçilen kolonlar değişir ve nesne oluşturulmaz
+# JSON alan sırası sözlük sırasından geldiği için kolonlar cevap şemasındaki alan sırasıyla seçilir
+# fields (sparse fieldset) verilirse SELECT'e sadece istenen kolonlar ve sayfalama için gereken kolonlar (required) girer
+def _schema_columns(table, schema, fields: Optional[Selection] = None, required: Sequence[str] = ()) -> List[str]:
+    selected = None if fields is None else {name for name, _ in fields}
+    return [name for name in schema.model_fields
+            if name in table.c and (selected is None or name in selected or name in required)]
+
+def _as_rows(query, model, schema, fields: Optional[Selection] = None, required: Sequence[str] = ("id",)) -> List[dict]:
+    names = _schema_columns(model.__table__, schema, fields, required)
+    return [dict(zip(names, row)) for row in query.with_entities(*(model.__table__.c[name] for name in names))]
+
+# Detay endpointlerinde fields verildiğinde tek satır sadece istenen kolonlarla okunur
+def _get_row(db: Session, model, schema, entity_id: int, fields: Selection) -> Optional[dict]:
+    rows = _as_rows(db.query(model).filter(model.id == entity_id), model, schema, fields)
+    return rows[0] if rows else None
+
+# Toplu ekleme kısmı
+BeforeCommit = Callable[[schemas.BulkCreateResult], None]
+
+# geçerli satırlar tek transaction içinde çok satırlı INSERT ... RETURNING ile eklenir
+# eşzamanlı bir istek yüzünden unique çakışması olursa satırlar savepoint ile tek tek denenir
+# böylece sadece çakışan kayıt hata alır, batch'in geri kalanı geri alınmaz
+# after_insert verilirse eklenen satırlarla commit'ten önce (aynı transaction içinde) çağrılır
+# before_commit verilirse sonuçla birlikte commit'ten hemen önce çağrılır (içe aktarımın ilerleme kaydı için)
+def _bulk_create(db: Session, model, rows: List[dict], errors: Dict[int, str],
+                 after_insert: Optional[Callable[[List[dict]], None]] = None,
+                 before_commit: Optional[BeforeCommit] = None) -> schemas.BulkCreateResult:
+    ids: List[Optional[int]] = [None] * len(rows)
+    valid = [index for index in range(len(rows)) if index not in errors]
+    if valid:
+        statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+        try:
+            created = db.execute(statement, [rows[index] for index in valid]).scalars().all()
+            for index, new_id in zip(valid, created):
+                ids[index] = new_id
+        except IntegrityError:
+            db.rollback()
+            # pysqlite SAVEPOINT'ten önce transaction açmaz; açık BEGIN olmadan her RELEASE kendi başına commit olur
+            # ve satırlar before_commit (içe aktarım ilerlemesi) ile aynı transaction'da kalmaz
+            db.connection().exec_driver_sql("BEGIN")
+            for index in valid:
+                try:
+                    with db.begin_nested():
+                        ids[index] = db.execute(insert(model).returning(model.id), rows[index]).scalar_one()
+                except IntegrityError:
+                    errors[index] = "Kayıt zaten mevcut"
+        if after_insert is not None:
+            after_insert([rows[index] for index in valid if ids[index] is not None])
+    result = _bulk_result(ids, errors)
+    if valid or before_commit is not None:
+        if before_commit is not None:
+            before_commit(result)
+        _commit(db, model.__tablename__)
+    return result
+
+def _bulk_result(ids: List[Optional[int]], errors: Dict[int, str]) -> schemas.BulkCreateResult:
+    return schemas.BulkCreateResult(
+        ids=ids,
+        errors=[schemas.BulkItemError(index=index, detail=detail) for index, detail in sorted(errors.items())],
+    )
+
+# Unique alanlar için hem batch içindeki tekrarları hem de veritabanındaki mevcut değerleri işaretler
+def _mark_duplicates(db: Session, column, values: List[str], errors: Dict[int, str], detail: str):
+    existing = {value for (value,) in db.query(column).filter(column.in_(set(values)))}
+    seen = set()
+    for index, value in enumerate(values):
+        if value in existing or value in seen:
+            errors.setdefault(index, detail)
+        seen.add(value)
+
+# Foreign key alanının işaret ettiği kayıtlar yoksa satırı hatalı sayar
+def _mark_missing(db: Session, column, values: List[int], errors: Dict[int, str], detail: str):
+    found = {value for (value,) in db.query(column).filter(column.in_(set(values)))}
+    for index, value in enumerate(values):
+        if value not in found:
+            errors.setdefault(index, detail)
+
+
 # user kısmı 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None, rows: bool = False,
+              fields: Optional[Selection] = None):
+    query = _paginate(db.query(models.User), models.User.id, skip, limit, after)
+    return _as_rows(query, models.User, schemas.User, fields) if rows or fields is not None else query.all()
+
+def get_users_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.User, schemas.User, ids)
 
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+def get_user(db: Session, user_id: int, fields: Optional[Selection] = None):
+    if fields is not None:
+        return _get_row(db, models.User, schemas.User, user_id, fields)
+    return _cached_get(models.User, schemas.User, user_id,
+                       lambda: db.query(models.User).filter(models.User.id == user_id).first())
 
 def create_user(db: Session, user: schemas.UserCreate):
     db_user = models.User(username=user.username, email=user.email)
     db.add(db_user)
-    db.commit()
+    _commit(db, "users")
     db.refresh(db_user)
+    _cache_put(models.User, schemas.User, db_user)
     return db_user
 
+# Kullanıcının siparişleri, orders.user_id index'i üzerinden keyset ile sayfalanır
+def get_user_orders(db: Session, user_id: int, limit: int = 100, after: Optional[int] = None):
+    query = _order_query(db).filter(models.Order.user_id == user_id)
+    return _paginate(query, models.Order.id, 0, limit, after).all()
+
+def export_users(db: Session, chunk_size: Optional[int] = None):
+    return _export(db, select(models.User.id, models.User.username, models.User.email)
+                   .order_by(models.User.id), chunk_size)
+
+def create_users_bulk(db: Session, users: List[schemas.UserCreate],
+                      before_commit: Optional[BeforeCommit] = None) -> schemas.BulkCreateResult:
+    errors: Dict[int, str] = {}
+    _mark_duplicates(db, models.User.username, [u.username for u in users], errors, "Kullanıcı adı zaten mevcut")
+    _mark_duplicates(db, models.User.email, [u.email for u in users], errors, "E-posta zaten mevcut")
+    rows = [{"username": u.username, "email": u.email} for u in users]
+    return _bulk_create(db, models.User, rows, errors, before_commit=before_commit)
+
 def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
-    db_user = get_user(db, user_id)
-    if not db_user:
+    row = _update_returning(db, models.User, user_id, _changes(models.User, user_update))
+    if row is None:
         return None
-    db_user.username = user_update.username
-    db_user.email = user_update.email
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    _commit(db, "users")
+    entity_cache.invalidate((models.User, user_id))
+    return row
 
 def delete_user(db: Session, user_id: int):
-    db_user = get_user(db, user_id)
-    if not db_user:
+    if _delete_returning(db, models.User, user_id) is None:
         return False
-    db.delete(db_user)
-    db.commit()
+    # kullanıcının siparişleri silinmez, sadece kullanıcı bağlantısı boşaltılır
+    db.execute(update(models.Order).where(models.Order.user_id == user_id).values(user_id=None))
+    _commit(db, "users", "orders")
+    entity_cache.invalidate((models.User, user_id))
     return True
 
 
 # category kısmı
-def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Category).offset(skip).limit(limit).all()
+def get_categories(db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None, rows: bool = False,
+                   fields: Optional[Selection] = None):
+    query = _paginate(db.query(models.Category), models.Category.id, skip, limit, after)
+    return _as_rows(query, models.Category, schemas.Category, fields) if rows or fields is not None else query.all()
+
+def get_categories_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.Category, schemas.Category, ids)
 
-def get_category(db: Session, category_id: int):
-    return db.query(models.Category).filter(models.Category.id == category_id).first()
+def get_category(db: Session, category_id: int, fields: Optional[Selection] = None):
+    if fields is not None:
+        return _get_row(db, models.Category, schemas.Category, category_id, fields)
+    return _cached_get(models.Category, schemas.Category, category_id,
+                       lambda: db.query(models.Category).filter(models.Category.id == category_id).first())
 
 def create_category(db: Session, category: schemas.CategoryCreate):
     db_category = models.Category(name=category.name)
     db.add(db_category)
-    db.commit()
+    _commit(db, "categories")
     db.refresh(db_category)
+    _cache_put(models.Category, schemas.Category, db_category)
     return db_category
 
+# Kategorideki ürünler, products.category_id index'i üzerinden keyset ile sayfalanır
+def get_category_products(db: Session, category_id: int, limit: int = 100, after: Optional[int] = None):
+    query = db.query(models.Product).filter(models.Product.category_id == category_id)
+    return _paginate(query, models.Product.id, 0, limit, after).all()
+
+def create_categories_bulk(db: Session, categories: List[schemas.CategoryCreate],
+                           before_commit: Optional[BeforeCommit] = None) -> schemas.BulkCreateResult:
+    errors: Dict[int, str] = {}
+    _mark_duplicates(db, models.Category.name, [c.name for c in categories], errors, "Kategori zaten mevcut")
+    rows = [{"name": c.name} for c in categories]
+    return _bulk_create(db, models.Category, rows, errors, before_commit=before_commit)
+
 def update_category(db: Session, category_id: int, category_update: schemas.CategoryCreate):
-    db_category = get_category(db, category_id)
-    if not db_category:
+    row = _update_returning(db, models.Category, category_id, _changes(models.Category, category_update))
+    if row is None:
         return None
-    db_category.name = category_update.name
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    _commit(db, "categories")
+    entity_cache.invalidate((models.Category, category_id))
+    return row
 
 def delete_category(db: Session, category_id: int):
-    db_category = get_category(db, category_id)
-    if not db_category:
+    if _delete_returning(db, models.Category, category_id) is None:
         return False
-    db.delete(db_category)
-    db.commit()
+    # kategori silinince ürünlerin category_id alanı boşaltılır, o ürünler de önbellekten düşer
+    statement = (update(models.Product).where(models.Product.category_id == category_id)
+                 .values(category_id=None).returning(models.Product.id))
+    product_ids = db.execute(statement).scalars().all()
+    # facet sayaçları kategorisiz ürünler satırına (category_id=0) taşınır
+    facet = models.ProductFacetCount
+    counts = db.query(facet.bucket, facet.count).filter(facet.category_id == category_id).all()
+    db.execute(delete(facet).where(facet.category_id == category_id))
+    _adjust_facets(db, {(0, bucket): count for bucket, count in counts})
+    revenue = db.execute(delete(models.CategoryRevenue).where(models.CategoryRevenue.category_id == category_id)
+                         .returning(models.CategoryRevenue.units_sold, models.CategoryRevenue.revenue)).first()
+    if revenue is not None:
+        _increment(db, models.CategoryRevenue, ("category_id",),
+                   [{"category_id": 0, "units_sold": revenue.units_sold, "revenue": revenue.revenue}])
+    # sipariş cevapları ürünlerin category_id alanını içerdiği için siparişlerin ETag'i de değişir
+    _commit(db, "categories", "products", "orders")
+    entity_cache.invalidate((models.Category, category_id))
+    for product_id in product_ids:
+        entity_cache.invalidate((models.Product, product_id))
     return True
 
 
 # product kısmı
-def get_products(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Product).offset(skip).limit(limit).all()
-
-def get_product(db: Session, product_id: int):
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
+# Ürün listeleme sıralamaları: sort adı -> (sıralama kolonu, azalan mı)
+PRODUCT_SORTS = {
+    "id": (models.Product.id, False),
+    "price": (models.Product.price, False),
+    "-price": (models.Product.price, True),
+    "name": (models.Product.name, False),
+}
+
+# Filtreler SQL'e eklenir; ad öneki LIKE yerine aralık karşılaştırması ile yazılır ki index kullanılabilsin
+def _filter_products(query, filters: Optional[schemas.ProductFilter]):
+    if filters is None:
+        return query
+    if filters.category_id is not None:
+        query = query.filter(models.Product.category_id == filters.category_id)
+    if filters.min_price is not None:
+        query = query.filter(models.Product.price >= filters.min_price)
+    if filters.max_price is not None:
+        query = query.filter(models.Product.price <= filters.max_price)
+    if filters.name_prefix:
+        query = query.filter(models.Product.name >= filters.name_prefix,
+                             models.Product.name < filters.name_prefix + chr(0x10FFFF))
+    return query
+
+# after: sort "id" ise son id, diğer sıralamalarda (sıralama değeri, id)
+def get_products(db: Session, skip: int = 0, limit: int = 100, after=None,
+                 filters: Optional[schemas.ProductFilter] = None, sort: str = "id", rows: bool = False,
+                 fields: Optional[Selection] = None):
+    query = _filter_products(db.query(models.Product), filters)
+    if sort == "id":
+        query = _paginate(query, models.Product.id, skip, limit, after)
+    else:
+        column, descending = PRODUCT_SORTS[sort]
+        query = _keyset_page(query, (column, models.Product.id), skip, limit, after, descending)
+    if rows or fields is not None:
+        # cursor için sıralama kolonu her zaman okunur
+        return _as_rows(query, models.Product, schemas.Product, fields, required=("id", PRODUCT_SORTS[sort][0].key))
+    return query.all()
+
+def get_products_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.Product, schemas.Product, ids)
+
+def get_product(db: Session, product_id: int, fields: Optional[Selection] = None):
+    if fields is not None:
+        return _get_row(db, models.Product, schemas.Product, product_id, fields)
+    return _cached_get(models.Product, schemas.Product, product_id,
+                       lambda: db.query(models.Product).filter(models.Product.id == product_id).first())
 
 def create_product(db: Session, product: schemas.ProductCreate):
     db_product = models.Product(
@@ -82,104 +462,535 @@ def create_product(db: Session, product: schemas.ProductCreate):
         category_id=product.category_id
     )
     db.add(db_product)
-    db.commit()
+    _adjust_facets(db, {_facet_key(product.category_id, product.price): 1})
+    _commit(db, "products")
     db.refresh(db_product)
+    _cache_put(models.Product, schemas.Product, db_product)
     return db_product
 
+def export_products(db: Session, chunk_size: Optional[int] = None):
+    product = models.Product
+    return _export(db, select(product.id, product.name, product.price, product.category_id)
+                   .order_by(product.id), chunk_size)
+
+def search_products(db: Session, q: str, limit: int = 100, after: Optional[Sequence] = None):
+    return _search(db, models.Product, models.products_fts, "name", q, limit, after)
+
+# Ürünün yorumları, reviews.product_id index'i üzerinden keyset ile sayfalanır
+def get_product_reviews(db: Session, product_id: int, limit: int = 100, after: Optional[int] = None):
+    query = db.query(models.Review).filter(models.Review.product_id == product_id)
+    return _paginate(query, models.Review.id, 0, limit, after).all()
+
+def create_products_bulk(db: Session, products: List[schemas.ProductCreate],
+                         before_commit: Optional[BeforeCommit] = None) -> schemas.BulkCreateResult:
+    errors: Dict[int, str] = {}
+    _mark_missing(db, models.Category.id, [p.category_id for p in products], errors, "Kategori bulunamadı")
+    rows = [{"name": p.name, "price": p.price, "category_id": p.category_id} for p in products]
+    return _bulk_create(db, models.Product, rows, errors,
+                        after_insert=lambda inserted: _adjust_facets(db, _facet_deltas(inserted)),
+                        before_commit=before_commit)
+
 def update_product(db: Session, product_id: int, product_update: schemas.ProductUpdate):
-    db_product = get_product(db, product_id)
-    if not db_product:
+    values = _changes(models.Product, product_update)
+    # fiyat veya kategori değişiyorsa facet sayaçları için eski değerler okunur
+    old = None
+    if "price" in values or "category_id" in values:
+        old = (db.query(models.Product.category_id, models.Product.price)
+               .filter(models.Product.id == product_id).first())
+        if old is None:
+            return None
+    row = _update_returning(db, models.Product, product_id, values)
+    if row is None:
         return None
-    db_product.name = product_update.name
-    db_product.price = product_update.price
-    db_product.category_id = product_update.category_id
-    db.commit()
-    db.refresh(db_product)
-    return db_product
+    if old is not None:
+        deltas: Dict[Tuple[int, int], int] = {}
+        _add_delta(deltas, _facet_key(old.category_id, old.price), -1)
+        _add_delta(deltas, _facet_key(row.category_id, row.price), 1)
+        _adjust_facets(db, deltas)
+        if (old.category_id or 0) != (row.category_id or 0):
+            _move_category_revenue(db, product_id, old.category_id, row.category_id)
+    _commit(db, "products", "orders")
+    entity_cache.invalidate((models.Product, product_id))
+    return row
 
 def delete_product(db: Session, product_id: int):
-    db_product = get_product(db, product_id)
-    if not db_product:
+    deleted = _delete_returning(db, models.Product, product_id, models.Product.category_id, models.Product.price)
+    if deleted is None:
         return False
-    db.delete(db_product)
-    db.commit()
+    _adjust_facets(db, {_facet_key(deleted.category_id, deleted.price): -1})
+    _drop_product_stats(db, product_id, deleted.category_id)
+    # yorumların ürün bağlantısı boşaltılır, siparişlerdeki ürün satırları silinir
+    db.execute(update(models.Review).where(models.Review.product_id == product_id).values(product_id=None))
+    db.execute(delete(models.order_product_association)
+               .where(models.order_product_association.c.product_id == product_id))
+    _commit(db, "products", "reviews", "orders")
+    entity_cache.invalidate((models.Product, product_id))
     return True
 
 
+# facet kısmı
+# product_facet_counts tablosu (kategori, fiyat aralığı) başına ürün sayısını tutar
+# ürün yazma işlemleri sayaçları aynı transaction içinde günceller, böylece facet maliyeti katalog boyutuyla büyümez
+def _price_bounds() -> List[float]:
+    return [float(value) for value in settings.facet_price_buckets.split(",")]
+
+# İlk sınırın altındaki fiyatlar ayrı bir aralıkta (-1) sayılır: sayaç yolundaki bucket >= filtresi
+# min_price ilk sınıra eşitken bunları dışarıda bırakır (cevapta min_price'ı boş bir aralık olarak gösterilir)
+def _facet_key(category_id: Optional[int], price: float) -> Tuple[int, int]:
+    return (category_id or 0, bisect_right(_price_bounds(), price) - 1)
+
+def _add_delta(deltas: Dict[Tuple[int, int], int], key: Tuple[int, int], amount: int):
+    deltas[key] = deltas.get(key, 0) + amount
+
+def _adjust_facets(db: Session, deltas: Dict[Tuple[int, int], int]):
+    _increment(db, models.ProductFacetCount, ("category_id", "bucket"),
+               [{"category_id": category_id, "bucket": bucket, "count": amount}
+                for (category_id, bucket), amount in deltas.items() if amount])
+
+# toplu eklemede tüm satırların sayaçları tek upsert ile yazılır
+def _facet_deltas(rows: List[dict]) -> Dict[Tuple[int, int], int]:
+    deltas: Dict[Tuple[int, int], int] = {}
+    for row in rows:
+        _add_delta(deltas, _facet_key(row["category_id"], row["price"]), 1)
+    return deltas
+
+# SQL tarafında fiyatın hangi aralığa düştüğünü hesaplayan ifade (rebuild ve canlı sayım için)
+def _bucket_expression():
+    bounds = _price_bounds()
+    return case(*[(models.Product.price >= bound, index) for index, bound in reversed(list(enumerate(bounds)))],
+                else_=-1)
+
+def _facet_result(category_counts, bucket_counts) -> schemas.ProductFacets:
+    bounds = _price_bounds()
+    return schemas.ProductFacets(
+        categories=[schemas.CategoryFacet(category_id=category_id or None, count=count)
+                    for category_id, count in category_counts if count],
+        # ilk sınırın altındaki fiyatlar (-1) alt sınırı olmayan ayrı bir aralık olarak döner
+        price_buckets=[schemas.PriceBucketFacet(min_price=bounds[bucket] if bucket >= 0 else None,
+                                                max_price=bounds[bucket + 1] if bucket + 1 < len(bounds) else None,
+                                                count=count)
+                       for bucket, count in bucket_counts if count],
+    )
+
+# Filtre aralık sınırlarına oturuyorsa sayaç tablosundan, oturmuyorsa (ad öneki, serbest fiyat aralığı)
+# filtrelenmiş ürünler üzerinde index'li GROUP BY ile hesaplanır
+def get_product_facets(db: Session, filters: Optional[schemas.ProductFilter] = None) -> schemas.ProductFacets:
+    filters = filters or schemas.ProductFilter()
+    bounds = _price_bounds()
+    if filters.name_prefix or filters.max_price is not None or (
+            filters.min_price is not None and filters.min_price not in bounds):
+        bucket = _bucket_expression()
+        query = _filter_products(db.query(models.Product), filters)
+        category_counts = (query.with_entities(models.Product.category_id, func.count())
+                           .group_by(models.Product.category_id).order_by(models.Product.category_id).all())
+        bucket_counts = query.with_entities(bucket, func.count()).group_by(bucket).order_by(bucket).all()
+        return _facet_result(category_counts, bucket_counts)
+
+    facet = models.ProductFacetCount
+    query = db.query(facet)
+    if filters.category_id is not None:
+        query = query.filter(facet.category_id == filters.category_id)
+    if filters.min_price is not None:
+        query = query.filter(facet.bucket >= bounds.index(filters.min_price))
+    total = func.sum(facet.count)
+    category_counts = (query.with_entities(facet.category_id, total)
+                       .group_by(facet.category_id).order_by(facet.category_id).all())
+    bucket_counts = query.with_entities(facet.bucket, total).group_by(facet.bucket).order_by(facet.bucket).all()
+    return _facet_result(category_counts, bucket_counts)
+
+# Sayaçları products tablosundan baştan hesaplar (ilk kurulum veya fiyat aralıkları değiştiğinde)
+def rebuild_product_facets(db: Session):
+    facet = models.ProductFacetCount
+    bucket = _bucket_expression()
+    category_id = func.coalesce(models.Product.category_id, 0)
+    db.execute(delete(facet))
+    counts = db.query(category_id, bucket, func.count()).group_by(category_id, bucket).all()
+    if counts:
+        db.execute(insert(facet), [{"category_id": c, "bucket": b, "count": n} for c, b, n in counts])
+    _commit(db, "products")  # /products/facets ETag'i değişir, eski sayıları tutan istemci 304 almaz
+
+
 # review kısmı
-def get_reviews(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Review).offset(skip).limit(limit).all()
+def get_reviews(db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None, rows: bool = False,
+                fields: Optional[Selection] = None):
+    query = _paginate(db.query(models.Review), models.Review.id, skip, limit, after)
+    return _as_rows(query, models.Review, schemas.Review, fields) if rows or fields is not None else query.all()
+
+def get_reviews_by_ids(db: Session, ids: List[int]):
+    return _get_many(db, models.Review, None, ids)
 
-def get_review(db: Session, review_id: int):
+def get_review(db: Session, review_id: int, fields: Optional[Selection] = None):
+    if fields is not None:
+        return _get_row(db, models.Review, schemas.Review, review_id, fields)
     return db.query(models.Review).filter(models.Review.id == review_id).first()
 
 def create_review(db: Session, review: schemas.ReviewCreate):
     db_review = models.Review(text=review.text, product_id=review.product_id)
     db.add(db_review)
-    db.commit()
+    _record_reviews(db, [review.product_id])
+    _commit(db, "reviews")
     db.refresh(db_review)
     return db_review
 
+def search_reviews(db: Session, q: str, limit: int = 100, after: Optional[Sequence] = None):
+    return _search(db, models.Review, models.reviews_fts, "text", q, limit, after)
+
+def create_reviews_bulk(db: Session, reviews: List[schemas.ReviewCreate],
+                        before_commit: Optional[BeforeCommit] = None) -> schemas.BulkCreateResult:
+    errors: Dict[int, str] = {}
+    _mark_missing(db, models.Product.id, [r.product_id for r in reviews], errors, "Ürün bulunamadı")
+    rows = [{"text": r.text, "product_id": r.product_id} for r in reviews]
+    return _bulk_create(db, models.Review, rows, errors,
+                        after_insert=lambda inserted: _record_reviews(db, [row["product_id"] for row in inserted]),
+                        before_commit=before_commit)
+
 def delete_review(db: Session, review_id: int):
-    db_review = get_review(db, review_id)
-    if not db_review:
+    deleted = _delete_returning(db, models.Review, review_id, models.Review.product_id)
+    if deleted is None:
         return False
-    db.delete(db_review)
-    db.commit()
+    _record_reviews(db, [deleted.product_id], sign=-1)
+    _commit(db, "reviews")
     return True
 
 def update_review(db: Session, review_id: int, review_update: schemas.ReviewUpdate):
-    db_review = get_review(db, review_id)
-    if not db_review:
+    row = _update_returning(db, models.Review, review_id, _changes(models.Review, review_update))
+    if row is None:
         return None
-    if review_update.text is not None:
-        db_review.text = review_update.text
-    db.commit()
-    db.refresh(db_review)
-    return db_review
+    _commit(db, "reviews")
+    return row
 
 
 # order kısmı
-def get_orders(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Order).offset(skip).limit(limit).all()
-
-def get_order(db: Session, order_id: int):
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
-
+# Order şeması ürünleri de içerdiği için ürünler selectin ile toplu yüklenir
+# sayfadaki tüm siparişlerin ürünleri tek bir IN sorgusu ile gelir (N+1 sorgu oluşmaz)
+def _order_query(db: Session):
+    return db.query(models.Order).options(selectinload(models.Order.products), selectinload(models.Order.items))
+
+def get_orders(db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None, rows: bool = False,
+               fields: Optional[Selection] = None):
+    if rows or fields is not None:
+        query = _paginate(db.query(models.Order), models.Order.id, skip, limit, after)
+        return _order_rows(db, _as_rows(query, models.Order, schemas.Order, fields), fields)
+    return _paginate(_order_query(db), models.Order.id, skip, limit, after).all()
+
+# Sayfadaki siparişlerin ürünleri ve kalemleri tek bir join sorgusu ile okunup sözlüklere eklenir
+# fields ile ikisi de istenmediyse sorgu atılmaz, sadece kalemler istendiyse products tablosuna join yapılmaz
+def _order_rows(db: Session, rows: List[dict], fields: Optional[Selection] = None) -> List[dict]:
+    selected = None if fields is None else dict(fields)
+    by_id = {}
+    for row in rows:
+        order = dict.fromkeys(schemas.Order.model_fields)
+        order.update(row, products=[], items=[])
+        by_id[order["id"]] = order
+    association, product = models.order_product_association, models.Product
+    item_names = product_names = []
+    if selected is None or "items" in selected:
+        item_names = _schema_columns(association, schemas.OrderItem, selected and selected["items"])
+    if selected is None or "products" in selected:
+        # ürün id'si her zaman okunur (sütunlu formatta yan tablo anahtarıdır)
+        product_names = _schema_columns(product.__table__, schemas.Product, selected and selected["products"],
+                                        required=("id",))
+    if not by_id or not (item_names or product_names):
+        return list(by_id.values())
+    query = db.query(association.c.order_id, *(association.c[name] for name in item_names),
+                     *(product.__table__.c[name] for name in product_names))
+    if product_names:
+        query = query.join(product, product.id == association.c.product_id)
+    lines = query.filter(association.c.order_id.in_(by_id)).order_by(association.c.order_id, association.c.product_id)
+    split = 1 + len(item_names)
+    for line in lines:
+        order = by_id[line[0]]
+        if item_names:
+            order["items"].append(dict(zip(item_names, line[1:split])))
+        if product_names:
+            order["products"].append(dict(zip(product_names, line[split:])))
+    return list(by_id.values())
+
+def get_order(db: Session, order_id: int, fields: Optional[Selection] = None):
+    if fields is not None:
+        rows = _order_rows(db, _as_rows(db.query(models.Order).filter(models.Order.id == order_id),
+                                        models.Order, schemas.Order, fields), fields)
+        return rows[0] if rows else None
+    return _order_query(db).filter(models.Order.id == order_id).first()
+
+# Siparişler kalem başına bir satır olarak düzleştirilir (kalemi olmayan sipariş tek satır, ürün alanları boş)
+# ilişki yüklemesi yapılmaz, order_product birleşik primary key sırasıyla tek bir LEFT JOIN sorgusu okunur
+def export_orders(db: Session, chunk_size: Optional[int] = None):
+    order, association = models.Order, models.order_product_association
+    statement = (select(order.id.label("order_id"), order.user_id, order.status, order.total,
+                        association.c.product_id, association.c.quantity, association.c.unit_price)
+                 .select_from(order).outerjoin(association, association.c.order_id == order.id)
+                 .order_by(order.id, association.c.product_id))
+    return _export(db, statement, chunk_size)
+
+# Siparişte bulunmayan ürünler için hata, router bu durumda 404 döner
+class MissingProductsError(ValueError):
+    def __init__(self, product_ids: List[int]):
+        self.product_ids = product_ids
+        super().__init__(f"Ürün bulunamadı: {product_ids}")
+
+# product_ids içindeki her id 1 adet sayılır, items ile gelen adetler üzerine eklenir
+def _order_quantities(order: schemas.OrderCreate) -> Dict[int, int]:
+    quantities: Dict[int, int] = {}
+    for product_id in order.product_ids:
+        quantities[product_id] = quantities.get(product_id, 0) + 1
+    for item in order.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+# Sipariş verme: ürünler tek sorguda doğrulanır, sipariş ve kalemleri tek transaction ile eklenir
+# kalemlerde sipariş anındaki birim fiyat saklanır ve toplam tutar siparişe yazılır (tek commit)
 def create_order(db: Session, order: schemas.OrderCreate):
-    # Siparişi oluşturma
-    db_order = models.Order(user_id=order.user_id)
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-
-    # Ürünlerin eklenmesi ile many to many yapısı
-    if order.product_ids:
-        products = db.query(models.Product).filter(models.Product.id.in_(order.product_ids)).all()
-        db_order.products.extend(products)
-        db.commit()
-        db.refresh(db_order)
-
-    return db_order
+    quantities = _order_quantities(order)
+    products = []
+    if quantities:
+        products = (db.query(models.Product).filter(models.Product.id.in_(quantities))
+                    .order_by(models.Product.id).all())
+    missing = sorted(set(quantities) - {product.id for product in products})
+    if missing:
+        raise MissingProductsError(missing)
+
+    items = [{"product_id": p.id, "quantity": quantities[p.id], "unit_price": p.price} for p in products]
+    total = sum(item["quantity"] * item["unit_price"] for item in items)
+    statement = insert(models.Order).values(user_id=order.user_id, total=total).returning(models.Order.id)
+    order_id = db.execute(statement).scalar_one()
+    if items:
+        db.execute(insert(models.order_product_association), [dict(item, order_id=order_id) for item in items])
+        _record_sales(db, [(p.id, p.category_id, quantities[p.id], p.price) for p in products])
+
+    created = schemas.Order(
+        id=order_id, user_id=order.user_id, total=total,
+        products=[schemas.Product.model_validate(p) for p in products],
+        items=[schemas.OrderItem(**item) for item in items],
+    )
+    _commit(db, "orders")
+    return created
+
+# Toplu sipariş ekleme (içe aktarım için): tüm siparişlerin ürünleri tek sorguda okunur,
+# siparişler ve kalemleri iki çok satırlı INSERT ile eklenir, hepsi tek commit içindedir
+# bulunamayan ürün içeren sipariş eklenmez, errors listesinde döner
+def create_orders_bulk(db: Session, orders: List[schemas.OrderCreate],
+                       before_commit: Optional[BeforeCommit] = None) -> schemas.BulkCreateResult:
+    quantities = [_order_quantities(order) for order in orders]
+    wanted = set().union(*quantities)
+    products = {}
+    if wanted:
+        products = {p.id: p for p in db.query(models.Product.id, models.Product.price, models.Product.category_id)
+                    .filter(models.Product.id.in_(wanted))}
+    errors: Dict[int, str] = {}
+    for index, order_quantities in enumerate(quantities):
+        missing = sorted(set(order_quantities) - products.keys())
+        if missing:
+            errors[index] = f"Ürün bulunamadı: {missing}"
+
+    ids: List[Optional[int]] = [None] * len(orders)
+    valid = [index for index in range(len(orders)) if index not in errors]
+    if valid:
+        totals = [sum(quantity * products[product_id].price for product_id, quantity in quantities[index].items())
+                  for index in valid]
+        statement = insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True)
+        created = db.execute(statement, [{"user_id": orders[index].user_id, "total": total}
+                                         for index, total in zip(valid, totals)]).scalars().all()
+        items = []
+        for index, order_id in zip(valid, created):
+            ids[index] = order_id
+            items.extend({"order_id": order_id, "product_id": product_id, "quantity": quantity,
+                          "unit_price": products[product_id].price}
+                         for product_id, quantity in sorted(quantities[index].items()))
+        if items:
+            db.execute(insert(models.order_product_association), items)
+            _record_sales(db, [(item["product_id"], products[item["product_id"]].category_id, item["quantity"],
+                                item["unit_price"]) for item in items])
+    result = _bulk_result(ids, errors)
+    if valid or before_commit is not None:
+        if before_commit is not None:
+            before_commit(result)
+        _commit(db, "orders")
+    return result
 
 def update_order_status(db: Session, order_id: int, status_update: schemas.OrderStatusUpdate):
-    db_order = get_order(db, order_id)
-    if not db_order:
+    row = _update_returning(db, models.Order, order_id, status_update.model_dump(exclude_unset=True, exclude_none=True))
+    if row is None:
         return None
-    if status_update.status is not None:
-        db_order.status = status_update.status
-    db.commit()
-    db.refresh(db_order)
-    return db_order
+    # cevap şeması ürünleri ve kalemleri de içerdiği için ikisi tek sorgu ile okunur, commit öncesinde kopyalanır
+    association = models.order_product_association
+    lines = (db.query(models.Product, association.c.quantity, association.c.unit_price)
+             .join(association).filter(association.c.order_id == order_id)
+             .order_by(models.Product.id).all())
+    order = schemas.Order(
+        id=row.id, user_id=row.user_id, total=row.total,
+        products=[schemas.Product.model_validate(product) for product, _, _ in lines],
+        items=[schemas.OrderItem(product_id=product.id, quantity=quantity, unit_price=unit_price)
+               for product, quantity, unit_price in lines],
+    )
+    _commit(db, "orders")
+    return order
 
 
 def delete_order(db: Session, order_id: int):
-    db_order = get_order(db, order_id)
-    if not db_order:
+    if _delete_returning(db, models.Order, order_id) is None:
         return False
-    db.delete(db_order)
-    db.commit()
+    association = models.order_product_association
+    lines = db.execute(delete(association).where(association.c.order_id == order_id)
+                       .returning(association.c.product_id, association.c.quantity, association.c.unit_price)).all()
+    if lines:
+        categories = dict(db.query(models.Product.id, models.Product.category_id)
+                          .filter(models.Product.id.in_([line.product_id for line in lines])))
+        _record_sales(db, [(line.product_id, categories.get(line.product_id), line.quantity, line.unit_price)
+                           for line in lines], sign=-1)
+    _commit(db, "orders")
     return True
 
     
-    
\ No newline at end of file
+    
+
+
+# analytics kısmı
+# product_stats ve category_revenue özet tabloları sipariş ve yorum yazma işlemleriyle aynı transaction içinde güncellenir
+# raporlar bu tablolardan okunur, siparişler ve kalemleri taranmaz
+
+# lines: (product_id, category_id, adet, birim fiyat); sign=-1 silinen siparişin değerlerini geri alır
+# toplu siparişlerde aynı ürünün kalemleri tek satırda toplanır
+def _record_sales(db: Session, lines: Sequence[tuple], sign: int = 1):
+    products: Dict[int, List[int]] = {}
+    categories: Dict[int, List[int]] = {}
+    for product_id, category_id, quantity, unit_price in lines:
+        totals = products.setdefault(product_id, [0, 0, 0])
+        totals[0] += sign
+        totals[1] += sign * quantity
+        totals[2] += sign * quantity * unit_price
+        totals = categories.setdefault(category_id or 0, [0, 0])
+        totals[0] += sign * quantity
+        totals[1] += sign * quantity * unit_price
+    _increment(db, models.ProductStats, ("product_id",),
+               [{"product_id": product_id, "order_count": orders, "units_sold": units, "revenue": revenue}
+                for product_id, (orders, units, revenue) in products.items()])
+    _increment(db, models.CategoryRevenue, ("category_id",),
+               [{"category_id": category_id, "units_sold": units, "revenue": revenue}
+                for category_id, (units, revenue) in categories.items()])
+
+def _record_reviews(db: Session, product_ids: Sequence[Optional[int]], sign: int = 1):
+    counts: Dict[int, int] = {}
+    for product_id in product_ids:
+        if product_id is not None:
+            counts[product_id] = counts.get(product_id, 0) + sign
+    _increment(db, models.ProductStats, ("product_id",),
+               [{"product_id": product_id, "order_count": 0, "units_sold": 0, "revenue": 0, "review_count": count}
+                for product_id, count in counts.items()])
+
+# ürünün kategorisi değişince ürünün satış toplamları eski kategoriden yenisine taşınır
+def _move_category_revenue(db: Session, product_id: int, old_category_id: Optional[int],
+                           new_category_id: Optional[int]):
+    stats = (db.query(models.ProductStats.units_sold, models.ProductStats.revenue)
+             .filter(models.ProductStats.product_id == product_id).first())
+    if stats is None or not stats.units_sold:
+        return
+    _increment(db, models.CategoryRevenue, ("category_id",), [
+        {"category_id": old_category_id or 0, "units_sold": -stats.units_sold, "revenue": -stats.revenue},
+        {"category_id": new_category_id or 0, "units_sold": stats.units_sold, "revenue": stats.revenue},
+    ])
+
+# ürün silinince sipariş kalemleri de silindiği için ürünün satışları kategori cirosundan düşülür
+def _drop_product_stats(db: Session, product_id: int, category_id: Optional[int]):
+    stats = models.ProductStats
+    dropped = db.execute(delete(stats).where(stats.product_id == product_id)
+                         .returning(stats.units_sold, stats.revenue)).first()
+    if dropped is not None and dropped.units_sold:
+        _increment(db, models.CategoryRevenue, ("category_id",),
+                   [{"category_id": category_id or 0, "units_sold": -dropped.units_sold,
+                     "revenue": -dropped.revenue}])
+
+def _stats_columns():
+    stats = models.ProductStats
+    return (func.coalesce(stats.order_count, 0), func.coalesce(stats.units_sold, 0),
+            func.coalesce(stats.revenue, 0), func.coalesce(stats.review_count, 0))
+
+def _product_stats(product_id, name, order_count, units_sold, revenue, review_count) -> schemas.ProductStats:
+    return schemas.ProductStats(product_id=product_id, name=name, order_count=order_count,
+                                units_sold=units_sold, revenue=revenue, review_count=review_count)
+
+# sort kolonundaki index sondan okunur, sadece limit kadar satır ürünlerle birleştirilir
+def get_top_products(db: Session, sort: str = "revenue", limit: int = 10) -> List[schemas.ProductStats]:
+    stats = models.ProductStats
+    column = stats.__table__.c[sort]
+    rows = (db.query(models.Product.id, models.Product.name, *_stats_columns())
+            .select_from(stats).join(models.Product, models.Product.id == stats.product_id)
+            .filter(column > 0).order_by(column.desc(), stats.product_id.desc()).limit(limit).all())
+    return [_product_stats(*row) for row in rows]
+
+def get_category_revenue(db: Session) -> List[schemas.CategoryRevenue]:
+    revenue = models.CategoryRevenue
+    rows = (db.query(revenue.category_id, models.Category.name, revenue.units_sold, revenue.revenue)
+            .outerjoin(models.Category, models.Category.id == revenue.category_id)
+            .filter(revenue.units_sold != 0).order_by(revenue.revenue.desc(), revenue.category_id).all())
+    return [schemas.CategoryRevenue(category_id=category_id or None, name=name, units_sold=units, revenue=total)
+            for category_id, name, units, total in rows]
+
+# ürün yoksa None, ürün var ama henüz satış/yorum yoksa sıfırlar döner
+def get_product_stats(db: Session, product_id: int) -> Optional[schemas.ProductStats]:
+    row = (db.query(models.Product.id, models.Product.name, *_stats_columns())
+           .outerjoin(models.ProductStats, models.ProductStats.product_id == models.Product.id)
+           .filter(models.Product.id == product_id).first())
+    return _product_stats(*row) if row is not None else None
+
+# Özet tabloları sipariş kalemleri ve yorumlardan baştan hesaplar (ilk kurulum veya geriye dönük doldurma için)
+def rebuild_analytics(db: Session):
+    association = models.order_product_association
+    line_revenue = association.c.quantity * association.c.unit_price
+    stats: Dict[int, dict] = {}
+    sales = (db.query(association.c.product_id, func.count(), func.sum(association.c.quantity), func.sum(line_revenue))
+             .group_by(association.c.product_id))
+    for product_id, order_count, units, revenue in sales:
+        stats[product_id] = {"product_id": product_id, "order_count": order_count, "units_sold": units,
+                             "revenue": revenue, "review_count": 0}
+    reviews = (db.query(models.Review.product_id, func.count())
+               .filter(models.Review.product_id.isnot(None)).group_by(models.Review.product_id))
+    for product_id, count in reviews:
+        stats.setdefault(product_id, {"product_id": product_id, "order_count": 0, "units_sold": 0,
+                                      "revenue": 0})["review_count"] = count
+    category_id = func.coalesce(models.Product.category_id, 0)
+    categories = (db.query(category_id, func.sum(association.c.quantity), func.sum(line_revenue))
+                  .select_from(association).join(models.Product, models.Product.id == association.c.product_id)
+                  .group_by(category_id).all())
+
+    db.execute(delete(models.ProductStats))
+    db.execute(delete(models.CategoryRevenue))
+    if stats:
+        db.execute(insert(models.ProductStats), list(stats.values()))
+    if categories:
+        db.execute(insert(models.CategoryRevenue),
+                   [{"category_id": c, "units_sold": units, "revenue": revenue} for c, units, revenue in categories])
+    _commit(db, "products")  # ürünlerden türetilen cevapların ETag'i yeniden hesaplama sonrası değişir
+
+
+# içe aktarım işleri kısmı
+# her parça commit'inden hemen önce işin ilerlemesi (son satır, sayılar) ve satır hataları aynı transaction içinde yazılır
+# böylece kesilen bir iş son commit edilen satırdan devam ettirildiğinde satırlar iki kez eklenmez
+def create_import_job(db: Session, resource: str, format: str, source: Optional[str] = None) -> models.ImportJob:
+    job = models.ImportJob(resource=resource, format=format, source=source, status="running")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_import_job(db: Session, job_id: int) -> Optional[models.ImportJob]:
+    return db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+
+def get_import_jobs(db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None):
+    return _paginate(db.query(models.ImportJob), models.ImportJob.id, skip, limit, after).all()
+
+def get_import_errors(db: Session, job_id: int, limit: int = 100, after: Optional[int] = None):
+    query = db.query(models.ImportLineError).filter(models.ImportLineError.job_id == job_id)
+    return _paginate(query, models.ImportLineError.id, 0, limit, after).all()
+
+def record_import_chunk(db: Session, job_id: int, line: int, imported: int, errors: List[Tuple[int, str]]):
+    job = models.ImportJob
+    db.execute(update(job).where(job.id == job_id).values(
+        line=line, imported=job.imported + imported, failed=job.failed + len(errors)))
+    if errors:
+        db.execute(insert(models.ImportLineError),
+                   [{"job_id": job_id, "line": error_line, "detail": detail} for error_line, detail in errors])
+
+def set_import_job_status(db: Session, job_id: int, status: str):
+    db.execute(update(models.ImportJob).where(models.ImportJob.id == job_id).values(status=status))
+    db.commit()
@@ -1,22 +1,139 @@
-from sqlalchemy import create_engine
+import time
+from typing import Dict, NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app import instrumentation
+from app.config import settings
+from app.executor import db_executor
+from app.metrics import POOL_CHECKOUT_WAIT
 
 # SQLite veritabanı kısmı
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# engine'ler DATABASE_PROFILE'a göre create_db_engine ile oluşturulur:
+# - default: tek engine, varsayılan journal modu ve havuz (eski davranış)
+# - production: WAL ve ayarlı PRAGMA'lar; GET route'ları salt okunur bir havuzdan (get_read_db),
+#   yazma route'ları tek bağlantılı yazıcı havuzundan (get_db) oturum alır. WAL'da okuyucular yazıcıyı
+#   beklemez; yazmalar tek bağlantıda sırayla yapılır, SQLite'ın dosya kilidi için yarışılmaz
+
+
+class DatabaseProfile(NamedTuple):
+    pragmas: Dict[str, object]
+    split_read_write: bool
+
+
+PROFILES = {
+    "default": DatabaseProfile(pragmas={}, split_read_write=False),
+    "production": DatabaseProfile(
+        pragmas={
+            "journal_mode": "WAL",  # okuyucular ve yazıcı birbirini bloklamaz
+            "synchronous": "NORMAL",  # WAL'da her commit yerine checkpoint'te fsync yapılır
+            "cache_size": -65536,  # negatif değer KiB: bağlantı başına 64 MB sayfa önbelleği
+            "mmap_size": 268435456,  # 256 MB bellek eşlemeli okuma
+            "busy_timeout": 5000,  # kilitli veritabanında hata yerine 5 sn beklenir
+            "temp_store": "MEMORY",  # sıralama/geçici tablolar bellekte
+        },
+        split_read_write=True,
+    ),
+}
+
+
+# Havuzdan bağlantı alırken beklenen süreyi ölçen QueuePool (db_pool_checkout_wait_seconds metriği)
+# etiket olarak engine'e verilen pool_logging_name kullanılır (write / read)
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, self.logging_name or "default")
+
+
+# SQLITE_PRAGMAS ile profilin PRAGMA'ları ezilebilir: "cache_size=-20000,mmap_size=0"
+def parse_pragmas(raw: str) -> Dict[str, str]:
+    pragmas = {}
+    for item in raw.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            pragmas[name.strip()] = value.strip()
+    return pragmas
+
+
+def create_db_engine(url: str, profile: str = "default", pragmas: str = "", read_only: bool = False,
+                     pool_size: int = 5, max_overflow: int = 10, name: str = "default"):
+    if profile not in PROFILES:
+        raise ValueError(f"Bilinmeyen veritabanı profili: {profile}")
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False}, poolclass=TimedQueuePool,
+        pool_size=pool_size, max_overflow=max_overflow, pool_logging_name=name,
+    )
+    statements = [f"PRAGMA {key}={value}" for key, value in {**PROFILES[profile].pragmas,
+                                                              **parse_pragmas(pragmas)}.items()]
+    if read_only:
+        statements.append("PRAGMA query_only=ON")  # yanlışlıkla okuma havuzundan yazılırsa hata verir
+    if statements:
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.close()
+    # sorgu ölçümü kapalıyken engine'e hiç dinleyici eklenmez
+    if settings.sql_instrumentation:
+        instrumentation.install(engine)
+    return engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+if getattr(PROFILES.get(settings.database_profile), "split_read_write", False):
+    engine = create_db_engine(SQLALCHEMY_DATABASE_URL, settings.database_profile, settings.sqlite_pragmas,
+                              pool_size=1, max_overflow=0, name="write")
+    read_engine = create_db_engine(SQLALCHEMY_DATABASE_URL, settings.database_profile, settings.sqlite_pragmas,
+                                   read_only=True, pool_size=settings.read_pool_size, max_overflow=0, name="read")
+else:
+    engine = read_engine = create_db_engine(SQLALCHEMY_DATABASE_URL, settings.database_profile,
+                                            settings.sqlite_pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
 # Veri tabanı oturumunu güvenli bir şekilde kapatmak için endpoint e verir ve istek sonunda kapatır
+# yazma işlemleri (POST/PATCH/DELETE) bu oturumu kullanır
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# GET route'ları için salt okunur oturum (default profilde get_db ile aynı engine'i kullanır)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# async okuma route'ları için: oturum event loop'ta açılır (bağlantı ilk sorguda alınır),
+# sorgular db_executor'da çalışır; bağlantı kullanıldıysa havuza iadesi (rollback) de executor'da yapılır,
+# önbellekten dönen istekte thread'e hiç geçilmez
+# executor yük altında işi reddederse (503) oturum yine kapatılır, aksi halde bağlantı havuza dönmezdi
+async def get_async_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        if db.in_transaction():
+            try:
+                await db_executor.run(db.close)
+            except HTTPException:
+                db.close()
+        else:
+            db.close()
+
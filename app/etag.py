@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.database import get_async_read_db
+from app.executor import db_executor
+from app.serializers import ListFormat, list_format
+
+# HTTP koşullu GET (ETag / If-None-Match) kısmı
+# ETag tablonun değişiklik sayacından üretilir; istemcinin elindeki değer güncelse
+# satırlar sorgulanmadan ve pydantic serileştirmesi yapılmadan 304 döner
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def _version(db: Session, table_name: str) -> int:
+    version = crud.cached_table_version(table_name)
+    if version is None:
+        version = await db_executor.run(crud.get_table_version, db, table_name)
+    return version
+
+
+def _check(request: Request, response: Response, etag: str, headers: Optional[Dict[str, str]] = None):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag, **(headers or {})})
+    response.headers["ETag"] = etag
+
+
+# Route'a dependency olarak eklenir: dependencies=[Depends(table_etag("products"))]
+# async route'larla aynı oturumu paylaşır; sayaç önbellekteyse veritabanına ve thread'e gidilmez
+def table_etag(table_name: str):
+    async def check(request: Request, response: Response, db: Session = Depends(get_async_read_db)):
+        _check(request, response, f'"{table_name}-{await _version(db, table_name)}"')
+
+    return check
+
+
+# Liste route'ları için: JSON ve sütunlu cevaplar aynı URL'den döndüğü için format ETag'e eklenir,
+# böylece bir formatın ETag'i diğer format için 304 almaz (format list_format ile aynı şekilde seçilir)
+def list_etag(table_name: str):
+    async def check(request: Request, response: Response, format: ListFormat = Depends(list_format),
+                    db: Session = Depends(get_async_read_db)):
+        _check(request, response, f'"{table_name}-{await _version(db, table_name)}-{format}"', {"Vary": "Accept"})
+
+    return check
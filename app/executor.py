@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.metrics import DEFAULT_BUCKETS, Collected, Histogram, registry
+from app.profiling import profiled
+
+# Async okuma route'ları için veritabanı executor'ı
+# async route'lar önbellek isabetlerini event loop'ta döner, sadece gerçek veritabanı işi buraya gönderilir
+# thread sayısı varsayılan olarak okuma havuzunun bağlantı sayısıdır (READ_POOL_SIZE), her worker bir bağlantı alır
+# anyio'nun 40 thread'lik ortak havuzu ve bağlantı havuzu beklemesi yerine bekleme bu kuyrukta olur ve ölçülür
+# kuyrukta DB_EXECUTOR_MAX_QUEUE kadar iş varsa yeni iş hemen, DB_EXECUTOR_MAX_WAIT_MS'ten uzun bekleyen iş
+# başlamadan 503 ile reddedilir
+
+WAIT = registry.register(Histogram(
+    "db_executor_wait_seconds", "İşin veritabanı executor kuyruğunda beklediği süre",
+    buckets=(0.0005, 0.001, 0.0025) + DEFAULT_BUCKETS))
+
+
+class DBExecutor:
+    def __init__(self, workers: int, max_queue: int, max_wait: float = 0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    def depth(self) -> int:
+        return self._queued
+
+    # fn worker thread'inde isteğin contextvar'larıyla (SQL ölçümü, profil) çalışır
+    async def run(self, fn: Callable, *args, **kwargs):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                raise HTTPException(status_code=503, detail="Veritabanı kuyruğu dolu", headers={"Retry-After": "1"})
+            self._queued += 1
+        context = contextvars.copy_context()
+        enqueued = time.perf_counter()
+
+        def job():
+            with self._lock:
+                self._queued -= 1
+            waited = time.perf_counter() - enqueued
+            WAIT.observe(waited)
+            if self.max_wait and waited > self.max_wait:
+                raise HTTPException(status_code=503, detail="Veritabanı kuyruğu dolu", headers={"Retry-After": "1"})
+            return context.run(profiled(fn), *args, **kwargs)
+
+        return await asyncio.wrap_future(self._pool.submit(job))
+
+
+db_executor = DBExecutor(settings.db_executor_workers or settings.read_pool_size, settings.db_executor_max_queue,
+                         settings.db_executor_max_wait_ms / 1000)
+
+registry.register(Collected("db_executor_queue_depth", "Veritabanı executor kuyruğunda bekleyen iş sayısı",
+                            "gauge", (), lambda: {(): db_executor.depth()}))
+registry.register(Collected("db_executor_workers", "Veritabanı executor thread sayısı", "gauge",
+                            (), lambda: {(): db_executor.workers}))
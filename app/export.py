@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+from typing import Iterator, Literal
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Result
+
+# Akış halinde dışa aktarım (NDJSON / CSV) kısmı
+# crud katmanı yield_per ile çalışan bir sorgu sonucu verir; satırlar parça parça okunur,
+# her parça tek bir metin bloğuna çevrilip gönderilir ve bellekte parçadan fazlası tutulmaz
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _ndjson_chunks(result: Result) -> Iterator[str]:
+    keys = list(result.keys())
+    for partition in result.partitions():
+        yield "".join(json.dumps(dict(zip(keys, row)), ensure_ascii=False, separators=(",", ":")) + "\n"
+                      for row in partition)
+
+
+def _csv_chunks(result: Result) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(result.keys())
+    for partition in result.partitions():
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # hiç satır yoksa sadece başlık satırı gönderilir
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _stream(result: Result, format: ExportFormat) -> Iterator[bytes]:
+    chunks = _csv_chunks(result) if format == "csv" else _ndjson_chunks(result)
+    try:
+        for chunk in chunks:
+            yield chunk.encode()
+    finally:
+        # istemci bağlantıyı yarıda keserse imleç de kapanır
+        result.close()
+
+
+def export_response(result: Result, format: ExportFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        _stream(result, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
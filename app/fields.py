@@ -0,0 +1,89 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, get_args, get_origin
+
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+
+# Seçici alan (sparse fieldset) kısmı
+# fields=id,name sadece istenen alanları döner; iç içe listeler için nokta kullanılır: fields=id,total,products.name
+# seçim cevap şemasının alan sırasıyla donmuş bir tuple'a çevrilir: (("id", None), ("products", (("name", None),)))
+# None alt seçim alanın tamamı demektir; aynı seçim için daraltılmış model bir kez oluşturulup önbellekte tutulur
+
+Selection = Tuple[Tuple[str, Optional["Selection"]], ...]
+
+
+def nested_schema(annotation) -> Optional[type]:
+    if get_origin(annotation) in (list, List):
+        annotation = get_args(annotation)[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _freeze(schema: type, requested: Dict[str, Optional[dict]]) -> Selection:
+    unknown = sorted(set(requested) - set(schema.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Geçersiz alan: {', '.join(unknown)}")
+    selection = []
+    for name, field in schema.model_fields.items():
+        if name not in requested:
+            continue
+        sub = requested[name]
+        if sub is not None:
+            nested = nested_schema(field.annotation)
+            if nested is None:
+                raise HTTPException(status_code=400, detail=f"Geçersiz alan: {name} iç içe seçilemez")
+            sub = _freeze(nested, sub)
+        selection.append((name, sub))
+    return tuple(selection)
+
+
+def parse_fields(fields: Optional[str], schema: type) -> Optional[Selection]:
+    if fields is None:
+        return None
+    requested: Dict[str, Optional[dict]] = {}
+    for path in fields.split(","):
+        parts = [part.strip() for part in path.split(".")]
+        if not all(parts):
+            continue
+        level = requested
+        for depth, part in enumerate(parts):
+            last = depth == len(parts) - 1
+            if last:
+                level[part] = None  # alanın tamamı, daha önce istenen alt alanları da kapsar
+            elif level.get(part, {}) is None:
+                break  # üst alan zaten tamamen seçilmiş
+            else:
+                level = level.setdefault(part, {})
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields en az bir alan içermeli")
+    return _freeze(schema, requested)
+
+
+# Seçime göre daraltılmış pydantic modeli, alanların tipleri ve varsayılanları asıl şemadan alınır
+@lru_cache(maxsize=256)
+def narrow(schema: type, selection: Selection) -> type:
+    definitions = {}
+    for name, sub in selection:
+        field = schema.model_fields[name]
+        annotation = field.annotation
+        if sub is not None:
+            annotation = List[narrow(nested_schema(annotation), sub)]
+        definitions[name] = (annotation, ... if field.is_required() else field.default)
+    return create_model(f"{schema.__name__}Fields", **definitions)
+
+
+def _thaw(selection: Optional[Selection]) -> Optional[dict]:
+    return None if selection is None else {name: _thaw(sub) for name, sub in selection}
+
+
+# Seçimdeki iç içe listelere id alanını ekler (sütunlu formatta yan tablo anahtarı olarak gerekir)
+def with_nested_ids(schema: type, selection: Optional[Selection]) -> Optional[Selection]:
+    if selection is None:
+        return None
+    requested = _thaw(selection)
+    for name, sub in requested.items():
+        nested = nested_schema(schema.model_fields[name].annotation)
+        if sub is not None and nested is not None and "id" in nested.model_fields:
+            sub["id"] = None
+    return _freeze(schema, requested)
@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import crud
+from app.config import settings
+from app.metrics import DEFAULT_BUCKETS, Collected, Histogram, registry
+
+# Grup commit kısmı (GROUP_COMMIT_ENABLED ile açılır)
+# eşzamanlı yazma istekleri (sipariş ve yorum ekleme) her biri kendi commit'ini yapmak yerine tek bir writer
+# thread'ine kuyruklanır; writer GROUP_COMMIT_WINDOW_MS boyunca veya GROUP_COMMIT_MAX_BATCH işe ulaşana kadar
+# gelen işleri tek transaction içinde çalıştırır ve bir kez commit eder (tek fsync, kilit için yarış yok)
+# her iş kendi SAVEPOINT'inde çalışır: hata veren işin değişiklikleri geri alınır, hatası sadece o isteğe döner
+# tablo sayaçları (ETag) batch sonunda bir kez artırılır
+
+BATCH_SIZE = registry.register(Histogram(
+    "group_commit_batch_size", "Tek commit ile yazılan iş sayısı", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)))
+QUEUE_WAIT = registry.register(Histogram(
+    "group_commit_queue_wait_seconds", "İşin kuyrukta writer'ı beklediği süre",
+    buckets=(0.0005, 0.001, 0.0025) + DEFAULT_BUCKETS))
+
+
+class _Job:
+    __slots__ = ("fn", "kwargs", "future", "enqueued")
+
+    def __init__(self, fn: Callable, kwargs: dict):
+        self.fn = fn
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class GroupCommitter:
+    def __init__(self, session_factory: sessionmaker, window: float, max_batch: int):
+        self._session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    # Çağıran thread işin sonucunu (veya hatasını) bekler; sonuç commit edildikten sonra döner
+    def submit(self, fn: Callable, **kwargs):
+        job = _Job(fn, kwargs)
+        self._queue.put(job)
+        return job.future.result()
+
+    def _collect(self) -> List[_Job]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._commit_batch(self._collect())
+
+    def _commit_batch(self, batch: List[_Job]):
+        BATCH_SIZE.observe(len(batch))
+        outcomes = []
+        db = self._session_factory()
+        try:
+            crud.begin_group(db)
+            for job in batch:
+                QUEUE_WAIT.observe(time.perf_counter() - job.enqueued)
+                savepoint = db.begin_nested()
+                try:
+                    result = job.fn(db, **job.kwargs)
+                    savepoint.commit()
+                except Exception as exc:
+                    savepoint.rollback()
+                    outcomes.append((job, None, exc))
+                else:
+                    outcomes.append((job, result, None))
+            crud.commit_group(db)
+        except Exception as exc:
+            # commit başarısızsa hiçbir iş yazılmamıştır, batch'teki tüm isteklere aynı hata döner
+            db.rollback()
+            crud.entity_cache.clear()  # commit öncesi önbelleğe yazılan değerler geçersizdir
+            for job in batch:
+                job.future.set_exception(exc)
+            return
+        finally:
+            db.close()
+        for job, result, error in outcomes:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+
+_committers: Dict[object, GroupCommitter] = {}
+_committers_lock = threading.Lock()
+
+
+# Engine başına tek writer; oturumlar expire_on_commit=False ile açılır, dönen nesneler commit sonrası okunabilir
+def _committer(bind) -> GroupCommitter:
+    with _committers_lock:
+        committer = _committers.get(bind)
+        if committer is None:
+            committer = _committers[bind] = GroupCommitter(
+                sessionmaker(bind=bind, autoflush=False, expire_on_commit=False),
+                settings.group_commit_window_ms / 1000, settings.group_commit_max_batch)
+        return committer
+
+
+# Route'lar crud yazma fonksiyonunu bununla çağırır: kapalıyken doğrudan isteğin oturumunda çalışır
+def run_write(db: Session, fn: Callable, **kwargs):
+    if not settings.group_commit_enabled:
+        return fn(db, **kwargs)
+    return _committer(db.get_bind()).submit(fn, **kwargs)
+
+
+registry.register(Collected("group_commit_queue_depth", "Writer kuyruğunda bekleyen iş sayısı", "gauge", (),
+                            lambda: {(): sum(committer.depth() for committer in list(_committers.values()))}))
@@ -0,0 +1,182 @@
+import codecs
+import csv
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.config import settings
+
+# Akış halinde toplu içe aktarım (NDJSON / CSV) kısmı
+# dosya satır satır okunur, her kayıt ilgili schemas.*Create modeli ile doğrulanır
+# geçerli kayıtlar import_chunk_size'lık parçalar halinde crud toplu ekleme fonksiyonlarıyla yazılır
+# her parça commit'i işin ilerlemesini de kaydeder, kesilen iş job_id ile son commit edilen satırdan devam eder
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# kaynak -> (doğrulama şeması, toplu ekleme fonksiyonu)
+RESOURCES: Dict[str, Tuple[type, Callable]] = {
+    "users": (schemas.UserCreate, crud.create_users_bulk),
+    "categories": (schemas.CategoryCreate, crud.create_categories_bulk),
+    "products": (schemas.ProductCreate, crud.create_products_bulk),
+    "reviews": (schemas.ReviewCreate, crud.create_reviews_bulk),
+    "orders": (schemas.OrderCreate, crud.create_orders_bulk),
+}
+
+
+# Devam ettirilmek istenen iş yoksa veya başka bir kaynağa aitse, router bu durumda 404/409 döner
+class ImportJobError(ValueError):
+    def __init__(self, detail: str, status_code: int):
+        self.detail = detail
+        self.status_code = status_code
+        super().__init__(detail)
+
+
+# Bayt parçalarını satırlara böler, parça sınırında kalan yarım satır ve çok baytlı karakterler bir sonraki parçaya taşınır
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+# (satır numarası, kayıt) üretir; ayrıştırılamayan satırlar için kayıt yerine hata metni döner
+def _ndjson_records(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, "Geçersiz JSON"
+            continue
+        yield line_no, record if isinstance(record, dict) else "Satır bir JSON nesnesi olmalı"
+
+
+# CSV'de boş hücreler gönderilmemiş alan sayılır; satır numarası kaydın bittiği fiziksel satırdır
+def _csv_records(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}
+
+
+# Siparişler CSV'de kalem başına bir satırdır (dışa aktarım biçimi): ardışık ve aynı order_id'ye sahip satırlar
+# tek siparişte toplanır; order_id sütunu yoksa her satır ayrı bir sipariştir
+def _csv_orders(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    order, key, last_line = None, None, 0
+    for line_no, row in _csv_records(lines):
+        row_key = row.get("order_id", line_no)
+        if order is not None and row_key != key:
+            yield last_line, order
+            order = None
+        if order is None:
+            order, key = {"user_id": row.get("user_id"), "items": []}, row_key
+        if "product_id" in row:
+            order["items"].append({"product_id": row["product_id"], "quantity": row.get("quantity", 1)})
+        last_line = line_no
+    if order is not None:
+        yield last_line, order
+
+
+def iter_records(lines: Iterable[str], resource: str, format: ImportFormat) -> Iterator[Tuple[int, object]]:
+    if format == "csv":
+        return _csv_orders(lines) if resource == "orders" else _csv_records(lines)
+    return _ndjson_records(lines)
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc']) or 'kayıt'}: {error['msg']}"
+                     for error in exc.errors())
+
+
+def _start(db: Session, resource: str, format: ImportFormat, source: Optional[str],
+           job_id: Optional[int]) -> models.ImportJob:
+    if job_id is None:
+        return crud.create_import_job(db, resource=resource, format=format, source=source)
+    job = crud.get_import_job(db, job_id)
+    if job is None:
+        raise ImportJobError("İçe aktarım işi bulunamadı", 404)
+    if job.resource != resource or job.format != format:
+        raise ImportJobError("İçe aktarım işi farklı bir kaynak veya biçime ait", 409)
+    if job.status == "completed":
+        raise ImportJobError("İçe aktarım işi zaten tamamlanmış", 409)
+    crud.set_import_job_status(db, job.id, "running")
+    return job
+
+
+def run_import(db: Session, resource: str, lines: Iterable[str], format: ImportFormat = "ndjson",
+               source: Optional[str] = None, job_id: Optional[int] = None, chunk_size: Optional[int] = None,
+               on_chunk: Optional[Callable[[models.ImportJob, List[Tuple[int, str]]], None]] = None) -> models.ImportJob:
+    """lines üzerinden içe aktarım yapar ve işin son durumunu döner.
+
+    job_id verilirse iş, son commit edilen satırdan sonraki satırlarla devam eder.
+    on_chunk her parça commit'inden sonra iş ve o parçanın satır hatalarıyla çağrılır (ilerleme raporu için).
+    """
+    schema, create_bulk = RESOURCES[resource]
+    chunk_size = chunk_size or settings.import_chunk_size
+    job = _start(db, resource, format, source, job_id)
+    job_id, resume_after = job.id, job.line
+    # iş okunurken açılan transaction kapatılır: girdi okunurken (HTTP'de istek gövdesi gelirken) bağlantı
+    # havuza döner, production profilinin tek bağlantılı yazıcı havuzunda diğer yazmalar beklemez
+    db.commit()
+
+    items: List[BaseModel] = []
+    item_lines: List[int] = []
+    errors: List[Tuple[int, str]] = []
+    last_line = resume_after
+
+    def flush():
+        chunk_errors = list(errors)
+
+        def before_commit(result: schemas.BulkCreateResult):
+            chunk_errors.extend((item_lines[error.index], error.detail) for error in result.errors)
+            chunk_errors.sort()
+            crud.record_import_chunk(db, job_id, last_line, len(items) - len(result.errors), chunk_errors)
+
+        create_bulk(db, items, before_commit=before_commit)
+        db.refresh(job)
+        if on_chunk is not None:
+            on_chunk(job, chunk_errors)
+        db.commit()  # refresh'in açtığı okuma transaction'ı sonraki parça okunmadan kapatılır
+        items.clear()
+        item_lines.clear()
+        errors.clear()
+
+    try:
+        for line_no, record in iter_records(lines, resource, format):
+            if line_no <= resume_after:
+                continue
+            last_line = line_no
+            if isinstance(record, str):
+                errors.append((line_no, record))
+            else:
+                try:
+                    items.append(schema.model_validate(record))
+                    item_lines.append(line_no)
+                except ValidationError as exc:
+                    errors.append((line_no, _validation_detail(exc)))
+            if len(items) + len(errors) >= chunk_size:
+                flush()
+        if items or errors:
+            flush()
+    except (UnicodeDecodeError, csv.Error) as exc:
+        db.rollback()
+        crud.set_import_job_status(db, job_id, "failed")
+        raise ImportJobError(f"Dosya okunamadı ({exc}), iş {job_id} son commit edilen satırdan devam ettirilebilir",
+                             400) from exc
+    except Exception:
+        # commit edilmemiş parça geri alınır, iş son commit edilen satırdan devam ettirilebilir
+        db.rollback()
+        crud.set_import_job_status(db, job_id, "failed")
+        raise
+    crud.set_import_job_status(db, job_id, "completed")
+    db.refresh(job)
+    return job
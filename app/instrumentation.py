@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+
+# İstek başına SQL ölçümü kısmı (SQL_INSTRUMENTATION ile açılır)
+# engine olayları her sorgunun süresini ölçer ve o an işlenen isteğe yazar; middleware cevaba
+# Server-Timing ve X-DB-Queries header'larını ekler, SLOW_QUERY_MS'i aşan sorgular app.sql logger'ına yazılır
+# kapalıyken engine'e dinleyici eklenmez ve middleware isteği doğrudan geçirir
+
+logger = logging.getLogger("app.sql")
+
+
+class QueryStats:
+    __slots__ = ("path", "count", "duration")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.duration = 0.0
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+# endpoint threadpool'da çalışsa da contextvar kopyalanır, aynı QueryStats nesnesi güncellenir
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+# Parametrelerin değerleri loglanmaz, sadece şekli: satır sayısı ve ilk satırdaki tipler
+def _parameters_shape(parameters, executemany: bool) -> dict:
+    rows = list(parameters) if executemany else [parameters]
+    first = rows[0] if rows else ()
+    values = first.values() if isinstance(first, dict) else first or ()
+    return {"rows": len(rows), "types": [type(value).__name__ for value in values]}
+
+
+# Başlangıç zamanı ifadenin execution context'inde tutulur: hata veren ifadede (IntegrityError, query_only)
+# after_cursor_execute çalışmasa da bağlantıda artık bir değer kalmaz
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+    if elapsed * 1000 >= settings.slow_query_ms:
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "path": stats.path if stats is not None else None,
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": statement,
+            "parameters": _parameters_shape(parameters, executemany),
+        }, ensure_ascii=False))
+
+
+def install(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstall(engine) -> None:
+    event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# Saf ASGI middleware: header'lar cevap başlarken eklenir (akış halindeki cevaplarda o ana kadarki sorgular)
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.sql_instrumentation:
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats(scope["path"])
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+                headers.append("X-DB-Queries", str(stats.count))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Prometheus metrik kısmı (harici servis veya kütüphane olmadan, metin formatı elle üretilir)
+# sayaç ve histogramlar thread başına ayrı tutulur: threadpool worker'ları gözlem yaparken ortak
+# bir kilide girmez, sadece bir thread ilk kez gözlem yaptığında kendi parçasını listeye eklerken kilit alınır
+# /metrics okunurken tüm thread parçaları toplanır
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+# Her thread kendi sözlüğüne yazar; sözlükler kaybolmasın diye (thread bitse de) listede tutulur
+class _Sharded(_Metric):
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _collect(self) -> Dict[Labels, list]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals: Dict[Labels, list] = {}
+        for shard in shards:
+            for labels, values in list(shard.items()):
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(values)
+                else:
+                    for index, value in enumerate(values):
+                        total[index] += value
+        return totals
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            shard[labels] = [amount]
+        else:
+            values[0] += amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(values[0])}"
+                for labels, values in sorted(self._collect().items())]
+
+
+# Kovalar parça içinde kümülatif olmayan sayılar olarak tutulur (gözlem başına tek artırma), çıktıda toplanır
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, values in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+            label_text = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+# Anlık değer; sadece event loop'ta (middleware) güncellendiği için paylaşımsız tek sözlük yeterlidir
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+        if not labelnames:
+            self._values[()] = 0
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in sorted(self._values.items())]
+
+
+# Okuma anında değer üreten metrikler (önbellek istatistikleri gibi) için: fonksiyon {labels: değer} döner
+class Collected(_Metric):
+    def __init__(self, name: str, help: str, kind: str, labelnames: Tuple[str, ...],
+                 collect: Callable[[], Dict[Labels, float]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in sorted(self._collect().items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP istek süresi (route şablonu başına)", ("method", "route")))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "İşlenmekte olan istek sayısı"))
+RESPONSES = registry.register(Counter(
+    "http_responses_total", "Durum kodu başına cevap sayısı", ("method", "route", "status")))
+POOL_CHECKOUT_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Bağlantı havuzundan bağlantı alırken beklenen süre", ("pool",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+
+
+# Route şablonu yönlendirme sırasında scope'a yazılan route'tan okunur (/orders/{order_id}, ham path değil)
+# eşleşmeyen istekler tek bir etikette toplanır, böylece rastgele path'ler yeni seri oluşturmaz
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"], template)
+            RESPONSES.inc(scope["method"], template, str(status))
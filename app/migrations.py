@@ -0,0 +1,82 @@
+from typing import Callable, List, Set
+
+from sqlalchemy.engine import Connection, Engine
+
+from app.models import Base, _fts_ddl
+
+# Şema yükseltme kısmı (python manage.py migrate)
+# create_all sadece eksik tabloları oluşturur; mevcut bir veritabanındaki tablolara sonradan eklenen kolon ve
+# index'leri eklemez. Adımlar her çalıştırmada kontrol edilir, zaten uygulanmış adım tekrar yapılmaz
+# tüm adımlar tek transaction içinde çalışır (SQLite DDL'i de geri alınabilir), hata olursa hiçbiri uygulanmaz
+
+
+def _columns(conn: Connection, table: str) -> Set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+# Sipariş kalemleri (adet, sipariş anındaki birim fiyat) ve siparişin toplam tutarı
+# eski siparişlerde her ürün bir adettir, birim fiyat ürünün şu anki fiyatından, toplam kalemlerden doldurulur
+def _order_totals(conn: Connection) -> List[str]:
+    applied = []
+    item_columns = _columns(conn, "order_product")
+    if "quantity" not in item_columns:
+        conn.exec_driver_sql("ALTER TABLE order_product ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1")
+        applied.append("order_product.quantity eklendi")
+    if "unit_price" not in item_columns:
+        conn.exec_driver_sql("ALTER TABLE order_product ADD COLUMN unit_price INTEGER NOT NULL DEFAULT 0")
+        conn.exec_driver_sql("UPDATE order_product SET unit_price = COALESCE("
+                             "(SELECT price FROM products WHERE products.id = order_product.product_id), 0)")
+        applied.append("order_product.unit_price eklendi ve ürün fiyatlarından dolduruldu")
+    if "total" not in _columns(conn, "orders"):
+        conn.exec_driver_sql("ALTER TABLE orders ADD COLUMN total INTEGER NOT NULL DEFAULT 0")
+        conn.exec_driver_sql("UPDATE orders SET total = COALESCE((SELECT SUM(quantity * unit_price) "
+                             "FROM order_product WHERE order_product.order_id = orders.id), 0)")
+        applied.append("orders.total eklendi ve kalemlerden dolduruldu")
+    return applied
+
+
+# Mevcut tablolara sonradan tanımlanan index'ler (listeleme ve ilişki sorguları için)
+def _indexes(conn: Connection) -> List[str]:
+    applied = []
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA index_list({table.name})")}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+                applied.append(f"{index.name} index'i oluşturuldu")
+    return applied
+
+
+def _sqlite_objects(conn: Connection, prefix: str) -> Set[str]:
+    return {row[0] for row in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE name LIKE ? || '%'", (prefix,))}
+
+
+# Tam metin arama tabloları ve trigger'ları sadece products/reviews ilk oluşturulurken kurulur;
+# mevcut veritabanında eksikse oluşturulur ve mevcut satırlar bir kez index'lenir
+def _fts(conn: Connection) -> List[str]:
+    applied = []
+    for source, text_column in (("products", "name"), ("reviews", "text")):
+        fts = f"{source}_fts"
+        before = _sqlite_objects(conn, fts)
+        for statement in _fts_ddl(source, text_column):
+            conn.exec_driver_sql(statement)
+        if fts not in before:
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            applied.append(f"{fts} oluşturuldu ve mevcut kayıtlar index'lendi")
+        elif _sqlite_objects(conn, fts) != before:
+            applied.append(f"{fts} trigger'ları oluşturuldu")
+    return applied
+
+
+STEPS: List[Callable[[Connection], List[str]]] = [_order_totals, _indexes, _fts]
+
+
+def upgrade(engine: Engine) -> List[str]:
+    Base.metadata.create_all(bind=engine)  # yeni tablolar
+    with engine.connect() as conn:
+        # pysqlite DDL'den önce transaction açmaz; açık BEGIN ile ALTER ve doldurma işlemleri birlikte commit edilir
+        conn.exec_driver_sql("BEGIN")
+        applied = [change for step in STEPS for change in step(conn)]
+        conn.commit()
+    return applied
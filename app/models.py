@@ -1,14 +1,20 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index, DDL, event, table, column
 from sqlalchemy.orm import relationship
 from .database import Base
 # veri tabanı tablolarını ve aralarındaki ilişkileri SQLAlchemy ORM ile tanımlama kısmı burada gerçekleşicektir
 
 # Order ile Product arasındaki many-to-many ilişki tablosu
+# (order_id, product_id) birleşik primary key hem tekrarı engeller hem de "siparişin ürünleri" sorgusunu indexler
+# ters yöndeki (product_id, order_id) index ise "ürünü içeren siparişler" sorgusu için kullanılır
+# her satır aynı zamanda bir sipariş kalemidir: adet ve sipariş anındaki birim fiyat burada tutulur
 order_product_association = Table(
     'order_product',
     Base.metadata,
-    Column('order_id', Integer, ForeignKey('orders.id')),
-    Column('product_id', Integer, ForeignKey('products.id'))
+    Column('order_id', Integer, ForeignKey('orders.id'), primary_key=True),
+    Column('product_id', Integer, ForeignKey('products.id'), primary_key=True),
+    Column('quantity', Integer, nullable=False, default=1),
+    Column('unit_price', Integer, nullable=False, default=0),
+    Index('ix_order_product_product_id_order_id', 'product_id', 'order_id')
 )
 # User tablosu: kullanıcı bilgilerini tutar ve  bir kullanıcının birden fazla siparişi olabilecktir
 
@@ -35,11 +41,18 @@ class Category(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    # listeleme filtreleri ve sıralamaları için birleşik indexler
+    # (kategori + fiyat aralığı/fiyat sıralaması, kategori + ad sıralaması, sadece fiyat sıralaması)
+    __table_args__ = (
+        Index("ix_products_category_id_price_id", "category_id", "price", "id"),
+        Index("ix_products_category_id_name_id", "category_id", "name", "id"),
+        Index("ix_products_price_id", "price", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
     price = Column(Integer, nullable=False)
-    category_id = Column(Integer, ForeignKey("categories.id"))
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
 
     category = relationship("Category", back_populates="products")
     reviews = relationship("Review", back_populates="product")
@@ -52,7 +65,7 @@ class Review(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String, nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
 
     product = relationship("Product", back_populates="reviews")
 
@@ -62,8 +75,118 @@ class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     user = relationship("User", back_populates="orders")
-    products = relationship("Product", secondary=order_product_association, back_populates="orders")
+    products = relationship("Product", secondary=order_product_association, back_populates="orders",
+                            order_by="Product.id")
+    items = relationship("OrderItem", viewonly=True, order_by="OrderItem.product_id")
     status = Column(String, default="pending")
+    # sipariş anında hesaplanan toplam tutar, listelemede ürünlerle join yapmaya gerek kalmaz
+    total = Column(Integer, nullable=False, default=0)
+
+# OrderItem: order_product tablosunun sipariş kalemi olarak okunan hali (adet ve fiyat bilgisi için)
+
+class OrderItem(Base):
+    __table__ = order_product_association
+
+# TableVersion tablosu: her tablonun değişiklik sayacını tutar, crud yazma işlemleri sayacı artırır
+# ETag değerleri bu sayaçtan üretildiği için 304 cevabı satırlar okunmadan verilebilir
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# ProductFacetCount tablosu: (kategori, fiyat aralığı) başına ürün sayısını tutar
+# ürün ekleme/güncelleme/silme işlemleri sayacı artırıp azaltır, facet sorguları products tablosunu taramaz
+
+class ProductFacetCount(Base):
+    __tablename__ = "product_facet_counts"
+
+    category_id = Column(Integer, primary_key=True, autoincrement=False)  # 0: kategorisiz ürünler
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+    count = Column(Integer, nullable=False, default=0)
+
+# ProductStats tablosu: ürün başına sipariş, satılan adet, ciro ve yorum sayısını tutar
+# sipariş ve yorum yazma işlemleri satırı aynı transaction içinde günceller, raporlar siparişleri taramaz
+# sıralama kolonlarındaki index'ler "en çok satanlar" sorgusunun sadece limit kadar satır okumasını sağlar
+
+class ProductStats(Base):
+    __tablename__ = "product_stats"
+    __table_args__ = (
+        Index("ix_product_stats_revenue", "revenue", "product_id"),
+        Index("ix_product_stats_units_sold", "units_sold", "product_id"),
+        Index("ix_product_stats_order_count", "order_count", "product_id"),
+        Index("ix_product_stats_review_count", "review_count", "product_id"),
+    )
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    order_count = Column(Integer, nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+
+# CategoryRevenue tablosu: kategori başına satılan adet ve ciroyu tutar
+# ürünün kategorisi değişirse ürünün toplamları yeni kategoriye taşınır
+
+class CategoryRevenue(Base):
+    __tablename__ = "category_revenue"
+
+    category_id = Column(Integer, primary_key=True, autoincrement=False)  # 0: kategorisiz ürünler
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+# ImportJob tablosu: toplu içe aktarım işlerinin durumunu tutar
+# line son commit edilen parçanın son satır numarasıdır, kesilen iş bu satırdan sonrasıyla devam eder
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource = Column(String, nullable=False)
+    format = Column(String, nullable=False)
+    source = Column(String)
+    status = Column(String, nullable=False, default="running")  # running, completed, failed
+    line = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+# ImportLineError tablosu: içe aktarımda eklenemeyen satırlar ve hata nedenleri
+
+class ImportLineError(Base):
+    __tablename__ = "import_errors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("import_jobs.id"), index=True, nullable=False)
+    line = Column(Integer, nullable=False)
+    detail = Column(String, nullable=False)
+
+# Tam metin arama (FTS5) tabloları: ürün adı ve yorum metni için
+# external content tablolarıdır, asıl veri products/reviews tablolarında kalır
+# trigger'lar her ekleme, güncelleme ve silmede index'i satır bazında günceller (tam rebuild yapılmaz)
+
+def _fts_ddl(source: str, text_column: str):
+    fts = f"{source}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({text_column}, content='{source}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {text_column}) VALUES (new.id, new.{text_column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {text_column}) VALUES ('delete', old.id, old.{text_column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {text_column} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {text_column}) VALUES ('delete', old.id, old.{text_column}); "
+        f"INSERT INTO {fts}(rowid, {text_column}) VALUES (new.id, new.{text_column}); END",
+    ]
+
+for _model, _text_column in ((Product, "name"), (Review, "text")):
+    for _statement in _fts_ddl(_model.__tablename__, _text_column):
+        event.listen(_model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+    event.listen(_model.__table__, "before_drop",
+                 DDL(f"DROP TABLE IF EXISTS {_model.__tablename__}_fts").execute_if(dialect="sqlite"))
+
+# crud sorgularında kullanılan hafif tablo tanımları (metadata'ya eklenmez, create_all oluşturmaz)
+products_fts = table("products_fts", column("rowid"), column("rank"), column("name"))
+reviews_fts = table("reviews_fts", column("rowid"), column("rank"), column("text"))
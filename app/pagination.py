@@ -0,0 +1,94 @@
+import base64
+import json
+from typing import Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+from app.config import settings
+
+# Keyset (cursor) sayfalama yardımcıları
+# cursor istemci için opak bir değerdir, içinde sayfanın son satırının sıralama anahtarı tutulur
+# böylece derin sayfalarda da offset kadar satır taranıp atılmaz
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MISSING_IDS_HEADER = "X-Missing-Ids"
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    # base64 ve json hataları ValueError olarak yukarı çıkar
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(values, list) or not values:
+        raise ValueError("Geçersiz cursor")
+    return values
+
+
+# cursor çözümü, types her pozisyon için beklenen tipleri verir; hatalı cursor 400 döner
+def parse_cursor(cursor: Optional[str], types: Sequence[tuple]) -> Optional[list]:
+    if cursor is None:
+        return None
+    try:
+        values = decode_cursor(cursor)
+    except ValueError:
+        values = None
+    if (not values or len(values) != len(types)
+            or any(type(value) not in kinds for value, kinds in zip(values, types))):
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+    return values
+
+
+# Sadece id ile sıralanan listeler için cursor çözümü
+def parse_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    values = parse_cursor(cursor, [(int,)])
+    return values[0] if values is not None else None
+
+
+# id dışındaki sıralamalarda cursor [sort, değer, id] şeklindedir
+# başka bir sıralama için üretilmiş cursor kullanılırsa 400 döner
+def parse_sort_cursor(cursor: Optional[str], sort: str, value_types: tuple) -> Optional[list]:
+    values = parse_cursor(cursor, [(str,), value_types, (int,)])
+    if values is None:
+        return None
+    if values[0] != sort:
+        raise HTTPException(status_code=400, detail="Cursor bu sıralamaya ait değil")
+    return values[1:]
+
+
+# Liste öğesinin alanını okur; öğe ORM nesnesi/şema veya hızlı serileştirmedeki satır sözlüğü olabilir
+def field(item, name: str):
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+# Sayfa doluysa bir sonraki sayfanın cursor değeri header olarak eklenir
+def set_next_cursor(response: Response, items: Sequence, limit: int,
+                    key: Callable = lambda item: (field(item, "id"),)):
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(items[-1]))
+
+
+# Çoklu okuma (?ids=1,5,9) kısmı
+# id listesi tekrarlar atılarak sırası korunur, liste uzunluğu ayarlardaki sınırı aşamaz
+def parse_ids(ids: Optional[str]) -> Optional[List[int]]:
+    if ids is None:
+        return None
+    try:
+        values = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz id listesi")
+    if not values or len(values) > settings.max_ids_per_request:
+        raise HTTPException(status_code=400,
+                            detail=f"id listesi 1 ile {settings.max_ids_per_request} arasında olmalı")
+    return values
+
+
+# İstenip bulunamayan id'ler header olarak raporlanır
+def set_missing_ids(response: Response, ids: List[int], items: Sequence):
+    found = {item.id for item in items}
+    missing = [str(item_id) for item_id in ids if item_id not in found]
+    if missing:
+        response.headers[MISSING_IDS_HEADER] = ",".join(missing)
@@ -0,0 +1,213 @@
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+import anyio
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+# İstek başına profil çıkarma kısmı (PROFILE_TOKEN / PROFILE_SAMPLE_RATE ile açılır)
+# X-Profile header'ı PROFILE_TOKEN ile aynıysa veya istek PROFILE_SAMPLE_RATE oranında örneklenirse
+# istek cProfile altında çalışır: event loop thread'i (middleware, pydantic serileştirme, cevap yazımı) ve
+# endpoint'in çalıştığı threadpool worker'ı (crud, sorgular) ayrı profiler'larla ölçülüp birleştirilir
+# (Python 3.12+'da tek profiler tüm thread'leri ölçer); profiler hatası isteği başarısız yapmaz
+# sonuç route şablonu ve çalışan SQL ifadeleriyle birlikte PROFILE_DIR altına yazılır, en yeni PROFILE_KEEP kayıt tutulur
+# tetiklenmeyen istekte profiler veya engine dinleyicisi yoktur; aynı anda tek bir istek profillenir
+
+PROFILE_HEADER = "x-profile"
+# Python 3.12+ cProfile'ı yorumlayıcı genelindeki sys.monitoring üzerinde çalışır: event loop'ta açılan profiler
+# worker thread'lerini de ölçer ve ikinci bir profiler açılamaz (ValueError); worker profili sadece eski sürümlerde açılır
+SEPARATE_WORKER_PROFILE = sys.version_info < (3, 12)
+
+logger = logging.getLogger("app.profiling")
+
+
+class Capture:
+    def __init__(self, method: str, path: str):
+        # zaman damgası ile başladığı için ada göre sıralama oluşturulma sırasıdır
+        self.id = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.loop_profile = cProfile.Profile()
+        self.worker_profile = cProfile.Profile()
+        self.statements: List[dict] = []
+        self.started = time.time()
+
+
+_current: ContextVar[Optional[Capture]] = ContextVar("profile_capture", default=None)
+# bir thread'de aynı anda tek profiler çalışabildiği için eşzamanlı profil alınmaz
+_active = threading.Lock()
+
+
+def _triggered(scope) -> bool:
+    if scope["path"].startswith("/profiles"):
+        return False  # kayıtları okumak için gönderilen header yeni kayıt oluşturmaz
+    if settings.profile_token:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode() and value.decode("latin-1") == settings.profile_token:
+                return True
+    return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+
+# Başlangıç zamanı execution context'te tutulur (hata veren ifadede bağlantıda artık kalmaz)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    capture = _current.get()
+    started = getattr(context, "_profile_start", None)
+    if capture is not None and started is not None:
+        elapsed = time.perf_counter() - started
+        capture.statements.append({"statement": statement, "duration_ms": round(elapsed * 1000, 3)})
+
+
+# Profiler açma/kapama hatası (başka bir profil aracı açık vb.) isteği başarısız yapmaz, sadece loglanır
+def _enable(profile: cProfile.Profile) -> bool:
+    try:
+        profile.enable()
+    except Exception:
+        logger.warning("Profiler açılamadı", exc_info=True)
+        return False
+    return True
+
+
+def _disable(profile: cProfile.Profile) -> None:
+    try:
+        profile.disable()
+    except Exception:
+        logger.warning("Profiler kapatılamadı", exc_info=True)
+
+
+# Senkron endpoint threadpool'da (async route'ların sorguları db_executor'da) çalışır;
+# profil alınan istekte o worker thread'inde de profiler açılır
+def profiled(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        capture = _current.get()
+        if capture is None or not SEPARATE_WORKER_PROFILE or not _enable(capture.worker_profile):
+            return endpoint(*args, **kwargs)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            _disable(capture.worker_profile)
+
+    return wrapper
+
+
+# Router'lara route_class olarak verilir: APIRouter(..., route_class=ProfiledRoute)
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _stats(capture: Capture) -> pstats.Stats:
+    stats = pstats.Stats(capture.loop_profile)
+    if capture.worker_profile.getstats():
+        stats.add(capture.worker_profile)
+    return stats
+
+
+def _rotate(directory: str) -> None:
+    captures = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+    for capture_id in captures[:max(len(captures) - settings.profile_keep, 0)]:
+        for suffix in (".json", ".prof"):
+            path = os.path.join(directory, capture_id + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def save(capture: Capture, route: str, status: int, duration: float) -> None:
+    directory = settings.profile_dir
+    os.makedirs(directory, exist_ok=True)
+    _stats(capture).dump_stats(os.path.join(directory, f"{capture.id}.prof"))
+    meta = {
+        "id": capture.id,
+        "method": capture.method,
+        "path": capture.path,
+        "route": route,
+        "status": status,
+        "duration_ms": round(duration * 1000, 3),
+        "created_at": capture.started,
+        "statements": capture.statements,
+    }
+    with open(os.path.join(directory, f"{capture.id}.json"), "w", encoding="utf-8") as file:
+        json.dump(meta, file, ensure_ascii=False)
+    _rotate(directory)
+
+
+def list_captures() -> List[dict]:
+    directory = settings.profile_dir
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as file:
+                captures.append(json.load(file))
+    return captures
+
+
+# Sadece listelenen kayıtların dosyası döner, capture_id path olarak yorumlanmaz
+def capture_path(capture_id: str) -> Optional[str]:
+    if not any(capture["id"] == capture_id for capture in list_captures()):
+        return None
+    return os.path.join(settings.profile_dir, f"{capture_id}.prof")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _triggered(scope) or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        capture = Capture(scope["method"], scope["path"])
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current.set(capture)
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        started = time.perf_counter()
+        profiling = _enable(capture.loop_profile)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if profiling:
+                _disable(capture.loop_profile)
+            duration = time.perf_counter() - started
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+            _current.reset(token)
+            _active.release()
+            if profiling:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                try:
+                    await anyio.to_thread.run_sync(save, capture, route, status, duration)
+                except Exception:
+                    logger.warning("Profil kaydı yazılamadı", exc_info=True)
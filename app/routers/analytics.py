@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app import crud, schemas
+from app.database import get_read_db
+from app.profiling import ProfiledRoute
+
+# Raporlama endpointleri
+# sonuçlar sipariş ve yorum yazma işlemleriyle güncellenen özet tablolardan okunur
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    route_class=ProfiledRoute
+)
+# En çok satan / en çok yorum alan ürünler (sort: revenue, units_sold, order_count, review_count)
+@router.get("/top-products", response_model=List[schemas.ProductStats])
+def read_top_products(sort: schemas.AnalyticsSort = "revenue", limit: int = Query(10, ge=1, le=100),
+                      db: Session = Depends(get_read_db)):
+    return crud.get_top_products(db, sort=sort, limit=limit)
+# Kategori başına satılan adet ve ciro
+@router.get("/category-revenue", response_model=List[schemas.CategoryRevenue])
+def read_category_revenue(db: Session = Depends(get_read_db)):
+    return crud.get_category_revenue(db)
+# Tek ürünün satış ve yorum istatistikleri
+@router.get("/product-stats/{product_id}", response_model=schemas.ProductStats)
+def read_product_stats(product_id: int, db: Session = Depends(get_read_db)):
+    stats = crud.get_product_stats(db, product_id=product_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Ürün bulunamadı")
+    return stats
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_read_db, get_db, get_read_db
+from app.etag import list_etag, table_etag
+from app.executor import db_executor
+from app.fields import parse_fields
+from app.pagination import parse_id_cursor, parse_ids, set_missing_ids, set_next_cursor
+from app.profiling import ProfiledRoute
+from app.serializers import ListFormat, fields_response, list_format
 
 # Category işlemleri için router tanımı yapılır
 # prefix ile tüm endpointlerin /categories ile başlamasını sağlar
@@ -11,32 +18,65 @@ from app.database import get_db
 
 router = APIRouter(
     prefix="/categories",
-    tags=["categories"]# Tüm kategorileri listeleyen endpoint
+    tags=["categories"],# Tüm kategorileri listeleyen endpoint
+    route_class=ProfiledRoute
 )
 
 # skip ve limit parametreleri sayfalama amacıyla kullanılır
+# cursor verilirse keyset sayfalama yapılır, sonraki sayfa X-Next-Cursor header'ında döner
 
-@router.get("/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_categories(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Category], dependencies=[Depends(list_etag("categories"))])
+async def read_categories(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                          ids: Optional[str] = None, fields: Optional[str] = None,
+                          format: ListFormat = Depends(list_format), db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Category)
+    id_list = parse_ids(ids)
+    if id_list is not None:
+        categories = await db_executor.run(crud.get_categories_by_ids, db, id_list)
+        set_missing_ids(response, id_list, categories)
+        return fields_response(response, schemas.Category, selection, categories, format=format)
+    categories = await db_executor.run(crud.get_categories, db, skip=skip, limit=limit,
+                                       after=parse_id_cursor(cursor), rows=settings.fast_serialization,
+                                       fields=selection)
+    set_next_cursor(response, categories, limit)
+    return fields_response(response, schemas.Category, selection, categories, format=format)
 
 # ID’ye göre tek bir kategori getiren endpoint
+# önbellekte varsa event loop'ta döner, yoksa sorgu db_executor'da çalışır
 
-@router.get("/{category_id}", response_model=schemas.Category)
-def read_category(category_id: int, db: Session = Depends(get_db)):
-    category = crud.get_category(db, category_id=category_id)
+@router.get("/{category_id}", response_model=schemas.Category, dependencies=[Depends(table_etag("categories"))])
+async def read_category(category_id: int, response: Response, fields: Optional[str] = None,
+                        db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Category)
+    category = crud.cached_category(category_id) if selection is None else None
+    if category is None:
+        category = await db_executor.run(crud.get_category, db, category_id=category_id, fields=selection)
         # Eğer kategori bulunamazsa 404 hatası döndürülür
     if category is None:
         raise HTTPException(status_code=404, detail="Kategori bulunamadı")
-    return category
+    return fields_response(response, schemas.Category, selection, category, many=False)
+# Kategorideki ürünleri listeleyen endpoint (keyset sayfalama)
+@router.get("/{category_id}/products", response_model=List[schemas.Product])
+def read_category_products(category_id: int, response: Response, limit: int = 100, cursor: Optional[str] = None,
+                           format: ListFormat = Depends(list_format), db: Session = Depends(get_read_db)):
+    products = crud.get_category_products(db, category_id=category_id, limit=limit, after=parse_id_cursor(cursor))
+    if not products and crud.get_category(db, category_id=category_id) is None:
+        raise HTTPException(status_code=404, detail="Kategori bulunamadı")
+    set_next_cursor(response, products, limit)
+    return fields_response(response, schemas.Product, None, products, format=format)
 # Yeni kategori oluşturan endpoint
 @router.post("/", response_model=schemas.Category, status_code=status.HTTP_201_CREATED)
 def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
     return crud.create_category(db=db, category=category)
+# Toplu ekleme: tek transaction ile çok satır eklenir, hatalı kayıtlar errors listesinde döner
+@router.post("/bulk", response_model=schemas.BulkCreateResult, status_code=status.HTTP_201_CREATED)
+def create_categories_bulk(categories: List[schemas.CategoryCreate] = Body(..., max_length=schemas.MAX_BULK_ITEMS),
+                           db: Session = Depends(get_db)):
+    return crud.create_categories_bulk(db=db, categories=categories)
 # Var olan bir kategoriyi güncelleyen endpoint
 @router.patch("/{category_id}", response_model=schemas.Category)
 def update_category(category_id: int, category_update: schemas.CategoryCreate, db: Session = Depends(get_db)):
-    updated = crud.update_category(db=db, category_id=category_id, category=category_update)
+    updated = crud.update_category(db=db, category_id=category_id, category_update=category_update)
     if updated is None:
         raise HTTPException(status_code=404, detail="Kategori bulunamadı")
     return updated
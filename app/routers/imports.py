@@ -0,0 +1,77 @@
+from typing import Iterator, List, Optional
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app import crud, importer, schemas
+from app.database import get_db, get_read_db
+from app.pagination import parse_id_cursor, set_next_cursor
+from app.profiling import ProfiledRoute
+
+# Toplu içe aktarım endpointleri
+# dosya istek gövdesi olarak gönderilir (Content-Type: application/x-ndjson veya text/csv)
+# örnek: curl -X POST --data-binary @urunler.csv -H "Content-Type: text/csv" http://127.0.0.1:8000/imports/products
+
+router = APIRouter(
+    prefix="/imports",
+    tags=["imports"],
+    route_class=ProfiledRoute
+)
+
+
+def _format(request: Request, format: Optional[importer.ImportFormat]) -> importer.ImportFormat:
+    if format is not None:
+        return format
+    return "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+
+# İstek gövdesi parça parça okunur; içe aktarım threadpool'da çalıştığı için parçalar event loop'tan istenir
+# böylece dosyanın tamamı belleğe alınmadan ayrıştırma ve yazma gövde geldikçe ilerler
+def _body_chunks(request: Request) -> Iterator[bytes]:
+    stream = request.stream()
+    while True:
+        try:
+            yield anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+# Yeni içe aktarım başlatma veya job_id ile kesilen işi devam ettirme
+# cevapta işin son durumu (eklenen ve hatalı kayıt sayıları) döner, satır hataları /imports/{job_id}/errors ile okunur
+@router.post("/{resource}", response_model=schemas.ImportJob)
+async def import_records(resource: schemas.ImportResource, request: Request,
+                         format: Optional[importer.ImportFormat] = None, job_id: Optional[int] = None,
+                         chunk_size: Optional[int] = Query(None, ge=1, le=50000), source: Optional[str] = None,
+                         db: Session = Depends(get_db)):
+    try:
+        return await run_in_threadpool(
+            importer.run_import, db, resource, importer.iter_lines(_body_chunks(request)),
+            format=_format(request, format), source=source, job_id=job_id, chunk_size=chunk_size,
+        )
+    except importer.ImportJobError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+# İçe aktarım işlerini listeleme (çalışan işlerin ilerlemesi line/imported/failed alanlarından izlenir)
+@router.get("/", response_model=List[schemas.ImportJob])
+def read_import_jobs(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                     db: Session = Depends(get_read_db)):
+    jobs = crud.get_import_jobs(db, skip=skip, limit=limit, after=parse_id_cursor(cursor))
+    set_next_cursor(response, jobs, limit)
+    return jobs
+# Tek içe aktarım işinin durumu
+@router.get("/{job_id}", response_model=schemas.ImportJob)
+def read_import_job(job_id: int, db: Session = Depends(get_read_db)):
+    job = crud.get_import_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İçe aktarım işi bulunamadı")
+    return job
+# İşin satır hataları (satır numarası ve neden), keyset ile sayfalanır
+@router.get("/{job_id}/errors", response_model=List[schemas.ImportLineError])
+def read_import_errors(job_id: int, response: Response, limit: int = 100, cursor: Optional[str] = None,
+                       db: Session = Depends(get_read_db)):
+    errors = crud.get_import_errors(db, job_id, limit=limit, after=parse_id_cursor(cursor))
+    if not errors and crud.get_import_job(db, job_id) is None:
+        raise HTTPException(status_code=404, detail="İçe aktarım işi bulunamadı")
+    set_next_cursor(response, errors, limit)
+    return errors
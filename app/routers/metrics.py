@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import crud, fields, serializers
+from app.metrics import Collected, registry
+
+# Prometheus'un okuyacağı /metrics endpointi (text exposition format 0.0.4)
+# önbellek sayaçları her okumada mevcut istatistiklerden üretilir
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# entity önbelleği ve daraltılmış model / serileştirici lru_cache'leri
+def _cache_stats():
+    entity = crud.entity_cache.stats()
+    stats = {"entity": (entity["hits"], entity["misses"])}
+    for name, cached in (("fields_model", fields.narrow), ("list_serializer", serializers.list_adapter),
+                         ("columnar_layout", serializers._columnar_layout)):
+        info = cached.cache_info()
+        stats[name] = (info.hits, info.misses)
+    return stats
+
+
+def _cache_ratio():
+    return {(name,): hits / (hits + misses) if hits + misses else 0.0
+            for name, (hits, misses) in _cache_stats().items()}
+
+
+registry.register(Collected("cache_hits_total", "Önbellek isabet sayısı", "counter", ("cache",),
+                            lambda: {(name,): hits for name, (hits, _) in _cache_stats().items()}))
+registry.register(Collected("cache_misses_total", "Önbellek ıskalama sayısı", "counter", ("cache",),
+                            lambda: {(name,): misses for name, (_, misses) in _cache_stats().items()}))
+registry.register(Collected("cache_hit_ratio", "Önbellek isabet oranı (0-1)", "gauge", ("cache",), _cache_ratio))
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_read_db, get_db, get_read_db
+from app.etag import list_etag, table_etag
+from app.executor import db_executor
+from app.export import ExportFormat, export_response
+from app.fields import parse_fields
+from app.group_commit import run_write
+from app.pagination import parse_id_cursor, set_next_cursor
+from app.profiling import ProfiledRoute
+from app.serializers import ListFormat, fields_response, list_format
 
 # Order  işlemleri için router tanımı
 # prefix ile tüm sipariş endpointleri /orders ile başlar
@@ -11,23 +20,39 @@ from app.database import get_db
 
 router = APIRouter(
     prefix="/orders",
-    tags=["orders"]
+    tags=["orders"],
+    route_class=ProfiledRoute
 )
 # Tüm siparişleri listeleyen endpoint
-@router.get("/", response_model=List[schemas.Order])
-def read_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_orders(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Order], dependencies=[Depends(list_etag("orders"))])
+async def read_orders(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                      fields: Optional[str] = None, format: ListFormat = Depends(list_format),
+                      db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Order)
+    orders = await db_executor.run(crud.get_orders, db, skip=skip, limit=limit, after=parse_id_cursor(cursor),
+                                   rows=settings.fast_serialization, fields=selection)
+    set_next_cursor(response, orders, limit)
+    return fields_response(response, schemas.Order, selection, orders, format=format)
+# Siparişleri kalem başına bir satır olarak NDJSON veya CSV ile akış halinde dışa aktaran endpoint
+@router.get("/export")
+def export_orders(format: ExportFormat = "ndjson", db: Session = Depends(get_read_db)):
+    return export_response(crud.export_orders(db), format, "orders")
 # ID'ye göre tek bir siparişi getiren endpoint
-@router.get("/{order_id}", response_model=schemas.Order)
-def read_order(order_id: int, db: Session = Depends(get_db)):
-    order = crud.get_order(db, order_id=order_id)
+@router.get("/{order_id}", response_model=schemas.Order, dependencies=[Depends(table_etag("orders"))])
+async def read_order(order_id: int, response: Response, fields: Optional[str] = None,
+                     db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Order)
+    order = await db_executor.run(crud.get_order, db, order_id=order_id, fields=selection)
     if order is None:
         raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
-    return order
+    return fields_response(response, schemas.Order, selection, order, many=False)
 # Yeni bir sipariş oluşturan endpoint
 @router.post("/", response_model=schemas.Order, status_code=status.HTTP_201_CREATED)
 def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
-    return crud.create_order(db=db, order=order)
+    try:
+        return run_write(db, crud.create_order, order=order)
+    except crud.MissingProductsError as exc:
+        raise HTTPException(status_code=404, detail=f"Ürün bulunamadı: {exc.product_ids}")
 # ID'ye göre sipariş silen endpoint
 # 204 No Content: işlem başarılı fakat geri dönüş verisi yok dmektir
 @router.delete("/{order_id}", status_code=204)
@@ -1,29 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_read_db, get_db, get_read_db
+from app.etag import list_etag, table_etag
+from app.executor import db_executor
+from app.export import ExportFormat, export_response
+from app.fields import parse_fields
+from app.pagination import (field, parse_cursor, parse_id_cursor, parse_ids, parse_sort_cursor, set_missing_ids,
+                            set_next_cursor)
+from app.profiling import ProfiledRoute
+from app.serializers import ListFormat, fields_response, list_format
 
 router = APIRouter(
     prefix="/products",
-    tags=["products"]
+    tags=["products"],
+    route_class=ProfiledRoute
 )
+
 # Tüm ürünleri listeleme kısmı 
-@router.get("/", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_products(db, skip=skip, limit=limit)
+# category_id, min_price/max_price, name_prefix filtreleri ve sort parametresi SQL tarafında uygulanır
+@router.get("/", response_model=List[schemas.Product], dependencies=[Depends(list_etag("products"))])
+async def read_products(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                        ids: Optional[str] = None, category_id: Optional[int] = None,
+                        min_price: Optional[float] = None, max_price: Optional[float] = None,
+                        name_prefix: Optional[str] = None, sort: schemas.ProductSort = "id",
+                        fields: Optional[str] = None, format: ListFormat = Depends(list_format),
+                        db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Product)
+    id_list = parse_ids(ids)
+    if id_list is not None:
+        products = await db_executor.run(crud.get_products_by_ids, db, id_list)
+        set_missing_ids(response, id_list, products)
+        return fields_response(response, schemas.Product, selection, products, format=format)
+    filters = schemas.ProductFilter(category_id=category_id, min_price=min_price,
+                                    max_price=max_price, name_prefix=name_prefix)
+    if sort == "id":
+        after = parse_id_cursor(cursor)
+        key = lambda product: (field(product, "id"),)
+    else:
+        column = crud.PRODUCT_SORTS[sort][0].key
+        after = parse_sort_cursor(cursor, sort, (str,) if column == "name" else (int, float))
+        key = lambda product: (sort, field(product, column), field(product, "id"))
+    products = await db_executor.run(crud.get_products, db, skip=skip, limit=limit, after=after, filters=filters,
+                                     sort=sort, rows=settings.fast_serialization, fields=selection)
+    set_next_cursor(response, products, limit, key=key)
+    return fields_response(response, schemas.Product, selection, products, format=format)
+# Tüm ürünleri NDJSON veya CSV olarak akış halinde dışa aktarma
+@router.get("/export")
+def export_products(format: ExportFormat = "ndjson", db: Session = Depends(get_read_db)):
+    return export_response(crud.export_products(db), format, "products")
+# Ürün facet'leri: mevcut filtre için kategori ve fiyat aralığı başına ürün sayıları
+@router.get("/facets", response_model=schemas.ProductFacets, dependencies=[Depends(table_etag("products"))])
+async def read_product_facets(category_id: Optional[int] = None, min_price: Optional[float] = None,
+                              max_price: Optional[float] = None, name_prefix: Optional[str] = None,
+                              db: Session = Depends(get_async_read_db)):
+    filters = schemas.ProductFilter(category_id=category_id, min_price=min_price,
+                                    max_price=max_price, name_prefix=name_prefix)
+    return await db_executor.run(crud.get_product_facets, db, filters=filters)
+# Ürün adında tam metin arama (FTS5), sonuçlar alaka sırasına göre döner
+# /{id} route'undan önce tanımlanmalı, yoksa "search" bir id olarak yorumlanır
+@router.get("/search", response_model=List[schemas.Product], dependencies=[Depends(list_etag("products"))])
+async def search_products(q: str, response: Response, limit: int = 100, cursor: Optional[str] = None,
+                          format: ListFormat = Depends(list_format), db: Session = Depends(get_async_read_db)):
+    rows = await db_executor.run(crud.search_products, db, q=q, limit=limit,
+                                 after=parse_cursor(cursor, [(int, float), (int,)]))
+    set_next_cursor(response, rows, limit, key=lambda row: (row[1], row[0].id))
+    return fields_response(response, schemas.Product, None, [item for item, _ in rows], format=format)
 # ID'ye göre tek bir ürünü getirme 
-@router.get("/{product_id}", response_model=schemas.Product)
-def read_product(product_id: int, db: Session = Depends(get_db)):
-    product = crud.get_product(db, product_id=product_id)
+# önbellekte varsa event loop'ta döner, yoksa sorgu db_executor'da çalışır
+@router.get("/{product_id}", response_model=schemas.Product, dependencies=[Depends(table_etag("products"))])
+async def read_product(product_id: int, response: Response, fields: Optional[str] = None,
+                       db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Product)
+    product = crud.cached_product(product_id) if selection is None else None
+    if product is None:
+        product = await db_executor.run(crud.get_product, db, product_id=product_id, fields=selection)
     if product is None:
         raise HTTPException(status_code=404, detail="Ürün bulunamadı")
-    return product
+    return fields_response(response, schemas.Product, selection, product, many=False)
+# Ürünün yorumlarını listeleme (keyset sayfalama)
+@router.get("/{product_id}/reviews", response_model=List[schemas.Review])
+def read_product_reviews(product_id: int, response: Response, limit: int = 100, cursor: Optional[str] = None,
+                         format: ListFormat = Depends(list_format), db: Session = Depends(get_read_db)):
+    reviews = crud.get_product_reviews(db, product_id=product_id, limit=limit, after=parse_id_cursor(cursor))
+    if not reviews and crud.get_product(db, product_id=product_id) is None:
+        raise HTTPException(status_code=404, detail="Ürün bulunamadı")
+    set_next_cursor(response, reviews, limit)
+    return fields_response(response, schemas.Review, None, reviews, format=format)
 # yeni ürun ekleme kısmı 
 @router.post("/", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
     return crud.create_product(db=db, product=product)
+# Toplu ekleme: tek transaction ile çok satır eklenir, hatalı kayıtlar errors listesinde döner
+@router.post("/bulk", response_model=schemas.BulkCreateResult, status_code=status.HTTP_201_CREATED)
+def create_products_bulk(products: List[schemas.ProductCreate] = Body(..., max_length=schemas.MAX_BULK_ITEMS),
+                         db: Session = Depends(get_db)):
+    return crud.create_products_bulk(db=db, products=products)
 # Ürün güncelleme (PATCH – sadece gönderilen alanlar ile )
 @router.patch("/{product_id}", response_model=schemas.Product, response_model_exclude_none=True, response_model_exclude_unset=True)
 def update_product(product_id: int, product_update: schemas.ProductUpdate, db: Session = Depends(get_db)):
@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from app import profiling
+from app.config import settings
+
+# Profil kayıtlarını listeleme ve indirme endpointleri
+# PROFILE_TOKEN tanımlı değilse kapalıdır, istekler X-Profile header'ında aynı değeri göndermelidir
+# indirilen .prof dosyası pstats veya snakeviz ile açılabilir
+
+
+def require_profile_token(x_profile: Optional[str] = Header(None)):
+    if not settings.profile_token or x_profile != settings.profile_token:
+        raise HTTPException(status_code=403, detail="Profil kayıtlarına erişim yetkisi yok")
+
+
+router = APIRouter(
+    prefix="/profiles",
+    tags=["profiles"],
+    dependencies=[Depends(require_profile_token)]
+)
+# En yeni kayıtlar önce: route, durum kodu, süre ve çalışan SQL ifadeleri
+@router.get("/")
+def read_profiles():
+    return profiling.list_captures()
+# Kaydın cProfile çıktısını indirme
+@router.get("/{capture_id}")
+def download_profile(capture_id: str):
+    path = profiling.capture_path(capture_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil kaydı bulunamadı")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{capture_id}.prof")
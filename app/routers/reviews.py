@@ -1,30 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_read_db, get_db
+from app.etag import list_etag, table_etag
+from app.executor import db_executor
+from app.fields import parse_fields
+from app.group_commit import run_write
+from app.pagination import parse_cursor, parse_id_cursor, parse_ids, set_missing_ids, set_next_cursor
+from app.profiling import ProfiledRoute
+from app.serializers import ListFormat, fields_response, list_format
 
 router = APIRouter(
     prefix="/reviews",
-    tags=["reviews"]
+    tags=["reviews"],
+    route_class=ProfiledRoute
 )
 # Tüm yorumları listeleme
-@router.get("/", response_model=List[schemas.Review])
-def read_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_reviews(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Review], dependencies=[Depends(list_etag("reviews"))])
+async def read_reviews(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                       ids: Optional[str] = None, fields: Optional[str] = None,
+                       format: ListFormat = Depends(list_format), db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Review)
+    id_list = parse_ids(ids)
+    if id_list is not None:
+        reviews = await db_executor.run(crud.get_reviews_by_ids, db, id_list)
+        set_missing_ids(response, id_list, reviews)
+        return fields_response(response, schemas.Review, selection, reviews, format=format)
+    reviews = await db_executor.run(crud.get_reviews, db, skip=skip, limit=limit, after=parse_id_cursor(cursor),
+                                    rows=settings.fast_serialization, fields=selection)
+    set_next_cursor(response, reviews, limit)
+    return fields_response(response, schemas.Review, selection, reviews, format=format)
 
+# Yorum metninde tam metin arama (FTS5), sonuçlar alaka sırasına göre döner
+@router.get("/search", response_model=List[schemas.Review], dependencies=[Depends(list_etag("reviews"))])
+async def search_reviews(q: str, response: Response, limit: int = 100, cursor: Optional[str] = None,
+                         format: ListFormat = Depends(list_format), db: Session = Depends(get_async_read_db)):
+    rows = await db_executor.run(crud.search_reviews, db, q=q, limit=limit,
+                                 after=parse_cursor(cursor, [(int, float), (int,)]))
+    set_next_cursor(response, rows, limit, key=lambda row: (row[1], row[0].id))
+    return fields_response(response, schemas.Review, None, [item for item, _ in rows], format=format)
 # ID'ye göre tek bir yorumu getirme kısmı
-@router.get("/{review_id}", response_model=schemas.Review)
-def read_review(review_id: int, db: Session = Depends(get_db)):
-    review = crud.get_review(db, review_id=review_id)
+@router.get("/{review_id}", response_model=schemas.Review, dependencies=[Depends(table_etag("reviews"))])
+async def read_review(review_id: int, response: Response, fields: Optional[str] = None,
+                      db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.Review)
+    review = await db_executor.run(crud.get_review, db, review_id=review_id, fields=selection)
     if review is None:
         raise HTTPException(status_code=404, detail="Değerlendirme bulunamadı")
-    return review
+    return fields_response(response, schemas.Review, selection, review, many=False)
 # Yeni yorum ekleme ksımı
 @router.post("/", response_model=schemas.Review, status_code=status.HTTP_201_CREATED)
 def create_review(review: schemas.ReviewCreate, db: Session = Depends(get_db)):
-    return crud.create_review(db=db, review=review)
+    return run_write(db, crud.create_review, review=review)
+# Toplu ekleme: tek transaction ile çok satır eklenir, hatalı kayıtlar errors listesinde döner
+@router.post("/bulk", response_model=schemas.BulkCreateResult, status_code=status.HTTP_201_CREATED)
+def create_reviews_bulk(reviews: List[schemas.ReviewCreate] = Body(..., max_length=schemas.MAX_BULK_ITEMS),
+                        db: Session = Depends(get_db)):
+    return crud.create_reviews_bulk(db=db, reviews=reviews)
 # Yorum silme
 @router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_review(review_id: int, db: Session = Depends(get_db)):
@@ -1,34 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_read_db, get_db, get_read_db
+from app.etag import list_etag, table_etag
+from app.executor import db_executor
+from app.export import ExportFormat, export_response
+from app.fields import parse_fields
+from app.pagination import parse_id_cursor, parse_ids, set_missing_ids, set_next_cursor
+from app.profiling import ProfiledRoute
+from app.serializers import ListFormat, fields_response, list_format
 
 router = APIRouter(
     prefix="/users",
-    tags=["users"]
+    tags=["users"],
+    route_class=ProfiledRoute
 )
 
 # Tüm kullanıcıları listeleme kısmı
-@router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+@router.get("/", response_model=List[schemas.User], dependencies=[Depends(list_etag("users"))])
+async def read_users(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                     ids: Optional[str] = None, fields: Optional[str] = None,
+                     format: ListFormat = Depends(list_format), db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.User)
+    id_list = parse_ids(ids)
+    if id_list is not None:
+        users = await db_executor.run(crud.get_users_by_ids, db, id_list)
+        set_missing_ids(response, id_list, users)
+        return fields_response(response, schemas.User, selection, users, format=format)
+    users = await db_executor.run(crud.get_users, db, skip=skip, limit=limit, after=parse_id_cursor(cursor),
+                                  rows=settings.fast_serialization, fields=selection)
+    set_next_cursor(response, users, limit)
+    return fields_response(response, schemas.User, selection, users, format=format)
+
+# Tüm kullanıcıları NDJSON veya CSV olarak akış halinde dışa aktarma
+# /{user_id} route'undan önce tanımlanmalı
+@router.get("/export")
+def export_users(format: ExportFormat = "ndjson", db: Session = Depends(get_read_db)):
+    return export_response(crud.export_users(db), format, "users")
 
 # Tek kullanıcı getirme kısmı
-@router.get("/{user_id}", response_model=schemas.User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    user = crud.get_user(db, user_id=user_id)
+# önbellekte varsa event loop'ta döner, yoksa sorgu db_executor'da çalışır
+@router.get("/{user_id}", response_model=schemas.User, dependencies=[Depends(table_etag("users"))])
+async def read_user(user_id: int, response: Response, fields: Optional[str] = None,
+                    db: Session = Depends(get_async_read_db)):
+    selection = parse_fields(fields, schemas.User)
+    user = crud.cached_user(user_id) if selection is None else None
+    if user is None:
+        user = await db_executor.run(crud.get_user, db, user_id=user_id, fields=selection)
     if user is None:
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
-    return user
+    return fields_response(response, schemas.User, selection, user, many=False)
+
+# Kullanıcının siparişlerini listeleme kısmı (keyset sayfalama)
+# sayfa boş döndüğünde üst kaydın varlığı kontrol edilir, böylece normal durumda ek sorgu atılmaz
+@router.get("/{user_id}/orders", response_model=List[schemas.Order])
+def read_user_orders(user_id: int, response: Response, limit: int = 100, cursor: Optional[str] = None,
+                     format: ListFormat = Depends(list_format), db: Session = Depends(get_read_db)):
+    orders = crud.get_user_orders(db, user_id=user_id, limit=limit, after=parse_id_cursor(cursor))
+    if not orders and crud.get_user(db, user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+    set_next_cursor(response, orders, limit)
+    return fields_response(response, schemas.Order, None, orders, format=format)
 
 # Yeni kullanıcı oluşturma kısmı
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
+# Toplu ekleme: tek transaction ile çok satır eklenir, hatalı kayıtlar errors listesinde döner
+@router.post("/bulk", response_model=schemas.BulkCreateResult, status_code=status.HTTP_201_CREATED)
+def create_users_bulk(users: List[schemas.UserCreate] = Body(..., max_length=schemas.MAX_BULK_ITEMS),
+                      db: Session = Depends(get_db)):
+    return crud.create_users_bulk(db=db, users=users)
+
 # Kullanıcı güncelleme kısmı patch ile yapıldı kısmi olarak yapar
 @router.patch("/{user_id}", response_model=schemas.User)
 def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_db)):
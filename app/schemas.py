@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 # API istek ve cevaplarında kullanılacak veri şemalarının  tanımlanma kısmıdır 
 
@@ -66,6 +66,50 @@ class Product(ProductBase):
         from_attributes = True
 
 
+# ürün listeleme sıralamaları (- ile başlayan azalan sıralamadır)
+ProductSort = Literal["id", "price", "-price", "name"]
+
+# ürün listeleme filtreleri, hepsi SQL sorgusuna eklenir
+class ProductFilter(BaseModel):
+    category_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    name_prefix: Optional[str] = None  # büyük/küçük harf duyarlı önek eşleşmesi
+
+
+# ürün facet şemaları (kategori ve fiyat aralığı başına ürün sayısı)
+class CategoryFacet(BaseModel):
+    category_id: Optional[int]
+    count: int
+
+class PriceBucketFacet(BaseModel):
+    min_price: Optional[float]  # ilk sınırın altındaki fiyatlar için alt sınır yoktur
+    max_price: Optional[float]  # son aralıkta üst sınır yoktur
+    count: int
+
+class ProductFacets(BaseModel):
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucketFacet]
+
+
+# analytics şemaları (özet tablolardan okunur)
+AnalyticsSort = Literal["revenue", "units_sold", "order_count", "review_count"]
+
+class ProductStats(BaseModel):
+    product_id: int
+    name: str
+    order_count: int = 0
+    units_sold: int = 0
+    revenue: float = 0
+    review_count: int = 0
+
+class CategoryRevenue(BaseModel):
+    category_id: Optional[int]  # None: kategorisiz ürünler
+    name: Optional[str]
+    units_sold: int
+    revenue: float
+
+
 # review şemaları 
 class ReviewBase(BaseModel):
     text: str
@@ -85,13 +129,30 @@ class Review(ReviewBase):
 class OrderBase(BaseModel):
     user_id: int
 
+# product_ids içindeki her id 1 adet sayılır, adet gerekiyorsa items kullanılır
+class OrderItemCreate(BaseModel):
+    product_id: int
+    quantity: int = Field(1, ge=1)
+
 class OrderCreate(OrderBase):
     product_ids: List[int] = []
+    items: List[OrderItemCreate] = []
+
+class OrderItem(BaseModel):
+    product_id: int
+    quantity: int
+    unit_price: float
+
+    class Config:
+        from_attributes = True
 
 
 class Order(OrderBase):
     id: int
+    user_id: Optional[int] = None  # kullanıcı silinirse sipariş kalır, bağlantı boşaltılır
     products: List[Product] = []
+    items: List[OrderItem] = []
+    total: float = 0
 
     class Config:
         from_attributes = True
@@ -106,3 +167,40 @@ class OrderDelete(BaseModel):
 class OrderStatusUpdate(BaseModel):
     status: Optional[str] = None  
 
+
+# toplu ekleme şemaları
+# ids listesi gönderilen sırayla aynıdır, hata alan kayıtların yerinde None bulunur
+MAX_BULK_ITEMS = 5000
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+class BulkCreateResult(BaseModel):
+    ids: List[Optional[int]]
+    errors: List[BulkItemError] = []
+
+
+# içe aktarım şemaları
+ImportResource = Literal["users", "categories", "products", "reviews", "orders"]
+
+class ImportJob(BaseModel):
+    id: int
+    resource: str
+    format: str
+    source: Optional[str] = None
+    status: str
+    line: int  # son commit edilen satır, devam ettirme bu satırdan sonra başlar
+    imported: int
+    failed: int
+
+    class Config:
+        from_attributes = True
+
+class ImportLineError(BaseModel):
+    id: int
+    line: int
+    detail: str
+
+    class Config:
+        from_attributes = True
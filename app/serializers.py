@@ -0,0 +1,179 @@
+from functools import lru_cache
+from typing import Dict, List, Literal, NamedTuple, Optional, Sequence, Tuple, Union, get_args, get_origin
+
+from fastapi import Header, Query, Response
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+from app.config import settings
+from app.fields import Selection, nested_schema, narrow, with_nested_ids
+
+# Hızlı liste serileştirme kısmı (FAST_SERIALIZATION ile açılır)
+# normal yolda FastAPI her ORM nesnesini from_attributes ile response_model'e doğrular, sonra tekrar serileştirir
+# hızlı yolda crud satırları sözlük olarak döner ve önceden derlenmiş TypeAdapter (pydantic_core) ile
+# doğrulama yapılmadan doğrudan JSON'a yazılır; çıktı response_model ile aynı alan sırası ve tipleri kullanır
+
+
+# pydantic modelinden aynı alanlara (aynı sıra) sahip bir TypedDict üretir, iç içe modeller de çevrilir
+@lru_cache(maxsize=512)
+def _row_type(model: type) -> type:
+    fields = {name: _annotation(field.annotation) for name, field in model.model_fields.items()}
+    return TypedDict(f"{model.__name__}Row", fields)
+
+
+def _annotation(annotation):
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _row_type(annotation)
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return List[_annotation(get_args(annotation)[0])]
+    if origin is Union:
+        return Union[tuple(_annotation(arg) for arg in get_args(annotation))]
+    return annotation
+
+
+@lru_cache(maxsize=512)
+def list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(List[_row_type(model)])
+
+
+@lru_cache(maxsize=512)
+def item_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(_row_type(model))
+
+
+def _json_response(response: Response, content: bytes, media_type: str = "application/json") -> Response:
+    # dependency ve endpoint'in eklediği header'lar (ETag, X-Next-Cursor) korunur
+    fast = Response(content=content, media_type=media_type)
+    fast.raw_headers.extend(response.raw_headers)
+    return fast
+
+
+# crud satır sözlüğü değilse (önbellekteki şema, ORM nesnesi) modelin alanları okunarak sözlüğe çevrilir
+def _to_row(item, model: type):
+    if isinstance(item, dict):
+        return item
+    row = {}
+    for name, field in model.model_fields.items():
+        value = getattr(item, name)
+        nested = nested_schema(field.annotation)
+        if nested is not None:
+            value = [_to_row(element, nested) for element in value]
+        row[name] = value
+    return row
+
+
+# Hızlı yol kapalıysa öğeler olduğu gibi döner ve FastAPI response_model ile serileştirir
+def list_response(response: Response, model: type, items: Sequence):
+    if not settings.fast_serialization:
+        return items
+    return _json_response(response, list_adapter(model).dump_json([_to_row(item, model) for item in items]))
+
+
+# Sütunlu liste formatı kısmı (format=columnar veya Accept: application/vnd.columnar+json)
+# {"columns": [...], "rows": [[...], ...]} şeklinde döner, alan adları her satırda tekrarlanmaz
+# id'si olan iç içe listeler (Order.products) satırda id dizisi olarak yazılır, öğelerin kendisi
+# "tables" altında tekrarsız bir yan tabloda bir kez döner; id'si olmayanlar (Order.items) satır içinde
+# dizi dizisi olarak kalır ve sütun adları "nested" altında verilir
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.columnar+json"
+
+ListFormat = Literal["json", "columnar"]
+
+
+# Liste route'larına dependency olarak eklenir; format parametresi Accept header'ından önceliklidir
+# cevap Accept'e göre değiştiği için her liste cevabı (JSON, sütunlu ve 304) Vary: Accept taşır
+def list_format(response: Response, format: Optional[ListFormat] = Query(None),
+                accept: Optional[str] = Header(None)) -> ListFormat:
+    response.headers["Vary"] = "Accept"
+    if format is not None:
+        return format
+    if accept and COLUMNAR_MEDIA_TYPE in accept:
+        return "columnar"
+    return "json"
+
+
+class _Layout(NamedTuple):
+    columns: List[str]
+    fields: Tuple[Tuple[str, str, Tuple[str, ...]], ...]  # (alan, "value" | "ref" | "inline", iç sütunlar)
+    tables: Dict[str, List[str]]
+    nested: Dict[str, List[str]]
+    adapter: TypeAdapter
+
+
+def _cells(model: type):
+    return Tuple[tuple(_annotation(field.annotation) for field in model.model_fields.values())]
+
+
+# Model başına sütun düzeni ve hücre tiplerini bilen TypeAdapter bir kez oluşturulur
+@lru_cache(maxsize=256)
+def _columnar_layout(model: type) -> _Layout:
+    fields, cells, table_types, tables, nested = [], [], {}, {}, {}
+    for name, field in model.model_fields.items():
+        inner = nested_schema(field.annotation)
+        if inner is None:
+            fields.append((name, "value", ()))
+            cells.append(_annotation(field.annotation))
+            continue
+        inner_columns = tuple(inner.model_fields)
+        if "id" in inner.model_fields:
+            fields.append((name, "ref", inner_columns))
+            cells.append(List[inner.model_fields["id"].annotation])
+            tables[name] = list(inner_columns)
+            table_types[name] = TypedDict(f"{model.__name__}{name.title()}Table",
+                                     {"columns": List[str], "rows": List[_cells(inner)]})
+        else:
+            fields.append((name, "inline", inner_columns))
+            cells.append(List[_cells(inner)])
+            nested[name] = list(inner_columns)
+    payload = TypedDict(f"{model.__name__}Columnar", {
+        "columns": List[str],
+        "rows": List[Tuple[tuple(cells)]],
+        "tables": TypedDict(f"{model.__name__}Tables", table_types),
+        "nested": Dict[str, List[str]],
+    })
+    return _Layout(list(model.model_fields), tuple(fields), tables, nested, TypeAdapter(payload))
+
+
+def columnar_response(response: Response, schema: type, selection: Optional[Selection], items: Sequence) -> Response:
+    model = narrow(schema, with_nested_ids(schema, selection)) if selection is not None else schema
+    layout = _columnar_layout(model)
+    tables = {name: {} for name in layout.tables}
+    rows = []
+    for item in items:
+        row = _to_row(item, model)
+        cells = []
+        for name, kind, inner_columns in layout.fields:
+            value = row[name]
+            if kind == "ref":
+                seen = tables[name]
+                for element in value:
+                    if element["id"] not in seen:
+                        seen[element["id"]] = tuple(element[column] for column in inner_columns)
+                value = [element["id"] for element in value]
+            elif kind == "inline":
+                value = [tuple(element[column] for column in inner_columns) for element in value]
+            cells.append(value)
+        rows.append(tuple(cells))
+    content = layout.adapter.dump_json({
+        "columns": layout.columns,
+        "rows": rows,
+        "tables": {name: {"columns": layout.tables[name], "rows": list(seen.values())}
+                   for name, seen in tables.items()},
+        "nested": layout.nested,
+    })
+    return _json_response(response, content, COLUMNAR_MEDIA_TYPE)
+
+
+# fields= verilen isteklerde cevap seçime göre daraltılmış (önbellekteki) model ile serileştirilir
+# selection None ise normal cevap yoluna dönülür; format="columnar" listeler sütunlu formatta döner
+def fields_response(response: Response, schema: type, selection: Optional[Selection], data, many: bool = True,
+                    format: ListFormat = "json"):
+    if many and format == "columnar":
+        return columnar_response(response, schema, selection, data)
+    if selection is None:
+        return list_response(response, schema, data) if many else data
+    model = narrow(schema, selection)
+    if many:
+        return _json_response(response, list_adapter(model).dump_json([_to_row(item, model) for item in data]))
+    return _json_response(response, item_adapter(model).dump_json(_to_row(data, model)))
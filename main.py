@@ -1,14 +1,26 @@
 from fastapi import FastAPI
+from app.admission import AdmissionMiddleware
+from app.instrumentation import QueryStatsMiddleware
+from app.metrics import MetricsMiddleware
+from app.profiling import ProfilingMiddleware
 from app.database import engine
 from app.models import Base
-from app.routers import users, products, orders, categories, reviews
+from app.routers import users, products, orders, categories, reviews, analytics, imports, metrics, profiles
 
 Base.metadata.create_all(bind=engine)  # Tabloları oluştur
 
 app = FastAPI()
+app.add_middleware(ProfilingMiddleware)  # sadece X-Profile veya örnekleme ile tetiklenen isteklerde devreye girer
+app.add_middleware(QueryStatsMiddleware)  # SQL_INSTRUMENTATION kapalıyken isteği doğrudan geçirir
+app.add_middleware(AdmissionMiddleware)  # reddedilen istek profil/SQL ölçümüne girmez, metriklerde sayılır
+app.add_middleware(MetricsMiddleware)  # en dışta: süre ölçümü diğer middleware'leri de kapsar
 
 app.include_router(users.router)
 app.include_router(products.router)
 app.include_router(orders.router)
 app.include_router(categories.router)
-app.include_router(reviews.router)
\ No newline at end of file
+app.include_router(reviews.router)
+app.include_router(analytics.router)
+app.include_router(imports.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
@@ -0,0 +1,73 @@
+import argparse
+import sys
+
+from app import crud, importer, migrations
+from app.database import SessionLocal, engine
+from app.models import Base
+
+# Yönetim komutları (uygulama çalışmadan veritabanı üzerinde yapılan işler)
+# kullanım: python manage.py migrate
+#           python manage.py rebuild-analytics
+#           python manage.py import products urunler.csv [--resume JOB_ID]
+
+
+def migrate(args):
+    applied = migrations.upgrade(engine)
+    for change in applied:
+        print(change)
+    print("Şema güncel" if not applied else f"{len(applied)} değişiklik uygulandı")
+
+
+def rebuild_analytics(args):
+    with SessionLocal() as db:
+        crud.rebuild_analytics(db)
+    print("Analytics özet tabloları yeniden hesaplandı")
+
+
+def rebuild_facets(args):
+    with SessionLocal() as db:
+        crud.rebuild_product_facets(db)
+    print("Ürün facet sayaçları yeniden hesaplandı")
+
+
+# Dosya satır satır okunur, her parça commit'inden sonra ilerleme ve satır hataları stderr'e yazılır
+def import_file(args):
+    format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    def report(job, errors):
+        for line, detail in errors:
+            print(f"satır {line}: {detail}", file=sys.stderr)
+        print(f"iş {job.id}: satır {job.line}, eklenen {job.imported}, hatalı {job.failed}", file=sys.stderr)
+
+    with SessionLocal() as db, open(args.path, encoding="utf-8-sig", newline="") as lines:
+        try:
+            job = importer.run_import(db, args.resource, lines, format=format, source=args.path,
+                                      job_id=args.resume, chunk_size=args.chunk_size, on_chunk=report)
+        except importer.ImportJobError as exc:
+            sys.exit(exc.detail)
+    print(f"İçe aktarım tamamlandı (iş {job.id}): {job.imported} kayıt eklendi, {job.failed} satır hatalı")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Veritabanı yönetim komutları")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Mevcut veritabanına yeni kolon ve index'leri ekler").set_defaults(
+        handler=migrate)
+    commands.add_parser("rebuild-analytics", help="Sipariş ve yorum özet tablolarını baştan hesaplar").set_defaults(
+        handler=rebuild_analytics)
+    commands.add_parser("rebuild-facets", help="Ürün facet sayaçlarını baştan hesaplar").set_defaults(
+        handler=rebuild_facets)
+    import_parser = commands.add_parser("import", help="NDJSON veya CSV dosyasından toplu içe aktarım yapar")
+    import_parser.add_argument("resource", choices=sorted(importer.RESOURCES))
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["ndjson", "csv"], help="varsayılan: dosya uzantısından")
+    import_parser.add_argument("--resume", type=int, metavar="JOB_ID", help="kesilen işi son commit edilen satırdan devam ettirir")
+    import_parser.add_argument("--chunk-size", type=int, help="tek transaction ile eklenen kayıt sayısı")
+    import_parser.set_defaults(handler=import_file)
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)  # yeni tablolar (özet, içe aktarım) yoksa oluşturulur
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from main import app
-from app.database import Base, get_db
+from app import instrumentation
+from app.config import settings
+from app.database import Base, get_async_read_db, get_db, get_read_db
 from app.models import Base as ModelsBase  # Model'lerin Base'i
 
 # Test için ayrı veritabanı (ana veri tabanını bozmasın)
@@ -38,6 +40,29 @@ def client(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+# Bir blok içinde çalışan SQL sorgularını sayar (N+1 regresyon testleri için)
+@pytest.fixture(scope="function")
+def query_counter():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+# Test engine'ine istek başına SQL ölçüm dinleyicilerini ekler ve ayarı açar
+@pytest.fixture(scope="function")
+def sql_instrumentation(monkeypatch):
+    monkeypatch.setattr(settings, "sql_instrumentation", True)
+    instrumentation.install(engine)
+    yield settings
+    instrumentation.uninstall(engine)
+
@@ -1,5 +1,8 @@
+import json
+
 from fastapi.testclient import TestClient
 from app import schemas
+from app.config import settings
 
 # Entegrasyon testleri ile API'ların uçlarının birlikte çalışıp çalışmadığı kontrolü
 def test_create_and_read_user(client):
@@ -110,3 +113,628 @@ def test_delete_product(client):
 def test_invalid_request_bad_json(client):
     response = client.post("/users/", json={"username": "asdasd"})  # email eksik
     assert response.status_code == 422  # Validation error (zorunlu alan eksik gönderirse doğrulama hatası)
+
+def test_list_users_cursor_pagination(client):
+    # Keyset sayfalama: ilk sayfa X-Next-Cursor döner, cursor ile sonraki sayfa istenir
+    for i in range(3):
+        client.post("/users/", json={"username": f"page{i}", "email": f"page{i}@example.com"})
+
+    first = client.get("/users/", params={"limit": 2})
+    assert first.status_code == 200
+    assert [u["username"] for u in first.json()] == ["page0", "page1"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/users/", params={"limit": 2, "cursor": cursor})
+    assert [u["username"] for u in second.json()] == ["page2"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_list_invalid_cursor(client):
+    response = client.get("/orders/", params={"cursor": "bozuk-cursor"})
+    assert response.status_code == 400
+
+def test_bulk_create_users_reports_conflicts(client):
+    # Toplu ekleme: mevcut ve batch içinde tekrar eden kullanıcılar hata alır, diğerleri eklenir
+    client.post("/users/", json={"username": "taken", "email": "taken@example.com"})
+    response = client.post("/users/bulk", json=[
+        {"username": "bulk1", "email": "bulk1@example.com"},
+        {"username": "taken", "email": "other@example.com"},
+        {"username": "bulk2", "email": "bulk1@example.com"},
+        {"username": "bulk3", "email": "bulk3@example.com"},
+    ])
+    assert response.status_code == 201
+    data = response.json()
+    assert data["ids"][1] is None and data["ids"][2] is None
+    assert all(data["ids"][i] is not None for i in (0, 3))
+    assert [e["index"] for e in data["errors"]] == [1, 2]
+    assert len(client.get("/users/").json()) == 3
+
+def test_bulk_create_products_missing_category(client):
+    cat_id = client.post("/categories/", json={"name": "Bulk"}).json()["id"]
+    response = client.post("/products/bulk", json=[
+        {"name": "A", "price": 10, "category_id": cat_id},
+        {"name": "B", "price": 20, "category_id": 9999},
+    ])
+    data = response.json()
+    assert data["ids"][0] is not None
+    assert data["errors"] == [{"index": 1, "detail": "Kategori bulunamadı"}]
+
+def test_list_orders_query_count_is_constant(client, query_counter):
+    # Sipariş sayısı artsa da liste isteği sabit sayıda sorgu ile cevaplanmalı (N+1 olmamalı)
+    user_id = client.post("/users/", json={"username": "n1", "email": "n1@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "N1"}).json()["id"]
+    prod_ids = [client.post("/products/", json={"name": f"P{i}", "price": 10, "category_id": cat_id}).json()["id"]
+                for i in range(3)]
+    for i in range(10):
+        client.post("/orders/", json={"user_id": user_id, "product_ids": prod_ids[: i % 3 + 1]})
+
+    query_counter.clear()
+    response = client.get("/orders/")
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert sum(len(o["products"]) for o in response.json()) == 19
+    # ETag için okunan table_versions sorgusu hariç: siparişler + ürünler + kalemler için toplam 3 sorgu
+    selects = [s for s in query_counter if s.lstrip().upper().startswith("SELECT") and "table_versions" not in s]
+    assert len(selects) == 3
+
+def test_nested_list_endpoints(client):
+    # İç içe listeleme endpointleri: kullanıcının siparişleri, kategorinin ürünleri, ürünün yorumları
+    user_id = client.post("/users/", json={"username": "nested", "email": "nested@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Nested"}).json()["id"]
+    prod_id = client.post("/products/", json={"name": "Nested P", "price": 5, "category_id": cat_id}).json()["id"]
+    client.post("/reviews/", json={"text": "ok", "product_id": prod_id})
+    client.post("/reviews/", json={"text": "iyi", "product_id": prod_id})
+    client.post("/orders/", json={"user_id": user_id, "product_ids": [prod_id]})
+
+    orders = client.get(f"/users/{user_id}/orders")
+    assert orders.status_code == 200
+    assert orders.json()[0]["products"][0]["id"] == prod_id
+    assert [p["id"] for p in client.get(f"/categories/{cat_id}/products").json()] == [prod_id]
+
+    first = client.get(f"/products/{prod_id}/reviews", params={"limit": 1})
+    assert [r["text"] for r in first.json()] == ["ok"]
+    second = client.get(f"/products/{prod_id}/reviews",
+                        params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+    assert [r["text"] for r in second.json()] == ["iyi"]
+
+    assert client.get("/users/9999/orders").status_code == 404
+
+def test_conditional_get_with_etag(client):
+    # Değişiklik yoksa If-None-Match ile 304, yazma sonrası yeni ETag ile 200 dönmeli
+    client.post("/categories/", json={"name": "Etag"})
+    first = client.get("/categories/")
+    etag = first.headers["ETag"]
+
+    cached = client.get("/categories/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    client.post("/categories/", json={"name": "Etag 2"})
+    changed = client.get("/categories/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == 2
+
+def test_product_update_changes_order_etag(client):
+    # Sipariş cevabı ürünleri de içerdiği için ürün güncellemesi siparişlerin ETag'ini de değiştirir
+    cat_id = client.post("/categories/", json={"name": "Etag Cat"}).json()["id"]
+    prod_id = client.post("/products/", json={"name": "P", "price": 1, "category_id": cat_id}).json()["id"]
+    etag = client.get("/orders/").headers["ETag"]
+    client.patch(f"/products/{prod_id}", json={"name": "P2", "price": 2, "category_id": cat_id})
+    assert client.get("/orders/", headers={"If-None-Match": etag}).status_code == 200
+
+def test_category_delete_changes_order_etag(client):
+    # Kategori silinince ürünlerin category_id alanı boşalır, siparişlerdeki ürünler de değişmiş olur
+    cat_id = client.post("/categories/", json={"name": "Silinen"}).json()["id"]
+    prod_id = client.post("/products/", json={"name": "P", "price": 1, "category_id": cat_id}).json()["id"]
+    user_id = client.post("/users/", json={"username": "etag", "email": "etag@example.com"}).json()["id"]
+    client.post("/orders/", json={"user_id": user_id, "product_ids": [prod_id]})
+    etag = client.get("/orders/").headers["ETag"]
+    assert client.delete(f"/categories/{cat_id}").status_code == 204
+    response = client.get("/orders/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["products"][0]["category_id"] is None
+
+def test_patch_updates_only_sent_fields_in_one_statement(client, query_counter):
+    # PATCH sadece gönderilen alanı günceller ve ön okuma yapmadan UPDATE ... RETURNING kullanır
+    cat_id = client.post("/categories/", json={"name": "Patch"}).json()["id"]
+    prod_id = client.post("/products/", json={"name": "Eski", "price": 10, "category_id": cat_id}).json()["id"]
+
+    # fiyat/kategori değişmediği için facet sayaçları için ön okuma da gerekmez
+    query_counter.clear()
+    response = client.patch(f"/products/{prod_id}", json={"name": "Yeni"})
+    assert response.status_code == 200
+    assert response.json() == {"id": prod_id, "name": "Yeni", "price": 10, "category_id": cat_id}
+    product_statements = [s for s in query_counter if "products" in s]
+    assert len(product_statements) == 1 and "RETURNING" in product_statements[0]
+
+    assert client.patch("/products/9999", json={"price": 1}).status_code == 404
+    renamed = client.patch(f"/categories/{cat_id}", json={"name": "Patched"})
+    assert renamed.status_code == 200 and renamed.json()["name"] == "Patched"
+
+def test_delete_order_removes_product_links(client):
+    user_id = client.post("/users/", json={"username": "del_o", "email": "del_o@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Del"}).json()["id"]
+    prod_id = client.post("/products/", json={"name": "Del P", "price": 1, "category_id": cat_id}).json()["id"]
+    order_id = client.post("/orders/", json={"user_id": user_id, "product_ids": [prod_id]}).json()["id"]
+
+    assert client.delete(f"/orders/{order_id}").status_code == 204
+    assert client.delete(f"/orders/{order_id}").status_code == 404
+    # ürün silinebilmeli ve artık hiçbir siparişte görünmemeli
+    assert client.delete(f"/products/{prod_id}").status_code == 204
+    assert client.get("/orders/").json() == []
+
+def test_place_order_with_items_and_total(client, query_counter):
+    # Kalemler adet ve birim fiyat ile tek transaction içinde eklenir, toplam tutar siparişte saklanır
+    user_id = client.post("/users/", json={"username": "cart", "email": "cart@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Cart"}).json()["id"]
+    p1 = client.post("/products/", json={"name": "Kalem", "price": 10, "category_id": cat_id}).json()["id"]
+    p2 = client.post("/products/", json={"name": "Defter", "price": 25, "category_id": cat_id}).json()["id"]
+
+    query_counter.clear()
+    response = client.post("/orders/", json={"user_id": user_id, "product_ids": [p2],
+                                              "items": [{"product_id": p1, "quantity": 3}]})
+    assert response.status_code == 201
+    # ürün okuma + sipariş + kalemler (executemany) + iki özet tablo upsert'i + tablo sayacı, hepsi tek commit içinde
+    assert len(query_counter) == 6
+    data = response.json()
+    assert data["total"] == 55
+    assert data["items"] == [{"product_id": p1, "quantity": 3, "unit_price": 10},
+                             {"product_id": p2, "quantity": 1, "unit_price": 25}]
+
+    # fiyat değişse de siparişteki fiyat ve toplam değişmez
+    client.patch(f"/products/{p1}", json={"price": 99})
+    order = client.get(f"/orders/{data['id']}").json()
+    assert order["total"] == 55 and order["items"][0]["unit_price"] == 10
+
+def test_place_order_unknown_product(client):
+    user_id = client.post("/users/", json={"username": "ghost", "email": "ghost@example.com"}).json()["id"]
+    response = client.post("/orders/", json={"user_id": user_id, "product_ids": [404]})
+    assert response.status_code == 404
+    assert client.get("/orders/").json() == []
+
+def test_multi_get_products_by_ids(client):
+    # ?ids= ile tek sorguda birden fazla ürün okunur, bulunamayanlar X-Missing-Ids header'ında döner
+    cat_id = client.post("/categories/", json={"name": "Multi"}).json()["id"]
+    ids = [client.post("/products/", json={"name": f"M{i}", "price": i, "category_id": cat_id}).json()["id"]
+           for i in range(3)]
+
+    response = client.get("/products/", params={"ids": f"{ids[2]},999,{ids[0]}"})
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [ids[2], ids[0]]
+    assert response.headers["X-Missing-Ids"] == "999"
+
+    assert client.get("/users/", params={"ids": "1,abc"}).status_code == 400
+    too_many = ",".join(str(i) for i in range(1, 102))
+    assert client.get("/categories/", params={"ids": too_many}).status_code == 400
+
+def test_search_products_and_reviews(client):
+    # FTS5 arama: önek eşleşmesi, güncelleme/silme sonrası index'in güncel kalması ve keyset sayfalama
+    cat_id = client.post("/categories/", json={"name": "Search"}).json()["id"]
+    phone = client.post("/products/", json={"name": "Akıllı Telefon", "price": 1, "category_id": cat_id}).json()["id"]
+    case = client.post("/products/", json={"name": "Telefon Kılıfı", "price": 1, "category_id": cat_id}).json()["id"]
+    watch = client.post("/products/", json={"name": "Kol Saati", "price": 1, "category_id": cat_id}).json()["id"]
+
+    found = client.get("/products/search", params={"q": "tel"}).json()
+    assert {p["id"] for p in found} == {phone, case}
+
+    client.patch(f"/products/{watch}", json={"name": "Akıllı Saat Telefonlu"})
+    client.delete(f"/products/{case}")
+    first = client.get("/products/search", params={"q": "telefon", "limit": 1})
+    second = client.get("/products/search", params={"q": "telefon", "limit": 1,
+                                                    "cursor": first.headers["X-Next-Cursor"]})
+    assert {first.json()[0]["id"], second.json()[0]["id"]} == {phone, watch}
+    assert "X-Next-Cursor" not in client.get("/products/search", params={"q": "telefon", "limit": 5}).headers
+
+    client.post("/reviews/", json={"text": "Kargo çok hızlıydı", "product_id": phone})
+    assert [r["text"] for r in client.get("/reviews/search", params={"q": "hızlı"}).json()] == ["Kargo çok hızlıydı"]
+    assert client.get("/reviews/search", params={"q": "\"*("}).json() == []
+
+def test_product_filters_and_sorting_with_cursor(client):
+    # Filtreler ve sıralama SQL tarafında uygulanır, cursor ile sayfalama sıralamaya göre devam eder
+    cat_a = client.post("/categories/", json={"name": "A"}).json()["id"]
+    cat_b = client.post("/categories/", json={"name": "B"}).json()["id"]
+    for name, price, cat in [("Mouse", 50, cat_a), ("Monitor", 900, cat_a), ("Mikrofon", 300, cat_a),
+                             ("Masa", 300, cat_a), ("Kamera", 500, cat_b)]:
+        client.post("/products/", json={"name": name, "price": price, "category_id": cat})
+
+    params = {"category_id": cat_a, "min_price": 100, "sort": "-price", "limit": 2}
+    first = client.get("/products/", params=params)
+    assert [p["name"] for p in first.json()] == ["Monitor", "Masa"]
+    second = client.get("/products/", params={**params, "cursor": first.headers["X-Next-Cursor"]})
+    assert [p["name"] for p in second.json()] == ["Mikrofon"]
+
+    by_name = client.get("/products/", params={"name_prefix": "M", "sort": "name"}).json()
+    assert [p["name"] for p in by_name] == ["Masa", "Mikrofon", "Monitor", "Mouse"]
+
+    # başka sıralamanın cursor'ı ve geçersiz sıralama reddedilir
+    assert client.get("/products/", params={"sort": "name", "cursor": first.headers["X-Next-Cursor"]}).status_code == 400
+    assert client.get("/products/", params={"sort": "stock"}).status_code == 422
+
+def test_product_facets_follow_writes(client):
+    # Facet sayaçları ürün ekleme, toplu ekleme, güncelleme ve silme ile artımlı güncellenir
+    cat_a = client.post("/categories/", json={"name": "Fa"}).json()["id"]
+    cat_b = client.post("/categories/", json={"name": "Fb"}).json()["id"]
+    cheap = client.post("/products/", json={"name": "Ucuz", "price": 50, "category_id": cat_a}).json()["id"]
+    client.post("/products/bulk", json=[{"name": "Orta", "price": 200, "category_id": cat_a},
+                                        {"name": "Pahalı", "price": 6000, "category_id": cat_b}])
+    client.patch(f"/products/{cheap}", json={"price": 150})
+
+    facets = client.get("/products/facets").json()
+    assert facets["categories"] == [{"category_id": cat_a, "count": 2}, {"category_id": cat_b, "count": 1}]
+    assert facets["price_buckets"] == [{"min_price": 100, "max_price": 500, "count": 2},
+                                       {"min_price": 5000, "max_price": None, "count": 1}]
+
+    client.delete(f"/categories/{cat_b}")
+    client.delete(f"/products/{cheap}")
+    facets = client.get("/products/facets", params={"min_price": 100}).json()
+    assert facets["categories"] == [{"category_id": None, "count": 1}, {"category_id": cat_a, "count": 1}]
+
+    # serbest fiyat aralığı ve ad öneki canlı sayım ile aynı sonucu verir
+    live = client.get("/products/facets", params={"max_price": 300, "name_prefix": "O"}).json()
+    assert live == {"categories": [{"category_id": cat_a, "count": 1}],
+                    "price_buckets": [{"min_price": 100, "max_price": 500, "count": 1}]}
+
+def test_analytics_summary_tables_follow_orders_and_reviews(client):
+    user_id = client.post("/users/", json={"username": "rapor", "email": "rapor@example.com"}).json()["id"]
+    cat_a = client.post("/categories/", json={"name": "Ra"}).json()["id"]
+    cat_b = client.post("/categories/", json={"name": "Rb"}).json()["id"]
+    p1 = client.post("/products/", json={"name": "Çok Satan", "price": 10, "category_id": cat_a}).json()["id"]
+    p2 = client.post("/products/", json={"name": "Pahalı", "price": 100, "category_id": cat_b}).json()["id"]
+    client.post("/orders/", json={"user_id": user_id, "items": [{"product_id": p1, "quantity": 5},
+                                                                {"product_id": p2, "quantity": 1}]})
+    second = client.post("/orders/", json={"user_id": user_id, "product_ids": [p1]}).json()["id"]
+    client.post("/reviews/bulk", json=[{"text": "iyi", "product_id": p2}, {"text": "güzel", "product_id": p2}])
+
+    top = client.get("/analytics/top-products", params={"sort": "units_sold"}).json()
+    assert [(s["product_id"], s["units_sold"], s["order_count"]) for s in top] == [(p1, 6, 2), (p2, 1, 1)]
+    assert client.get("/analytics/top-products", params={"sort": "review_count"}).json()[0]["product_id"] == p2
+    assert client.get(f"/analytics/product-stats/{p2}").json() == {
+        "product_id": p2, "name": "Pahalı", "order_count": 1, "units_sold": 1, "revenue": 100, "review_count": 2}
+    assert client.get("/analytics/product-stats/9999").status_code == 404
+
+    # sipariş silinince değerler geri alınır, ürünün kategorisi değişince cirosu taşınır
+    client.delete(f"/orders/{second}")
+    client.patch(f"/products/{p1}", json={"category_id": cat_b})
+    revenue = client.get("/analytics/category-revenue").json()
+    assert revenue == [{"category_id": cat_b, "name": "Rb", "units_sold": 6, "revenue": 150}]
+
+    client.delete(f"/categories/{cat_b}")
+    revenue = client.get("/analytics/category-revenue").json()
+    assert revenue == [{"category_id": None, "name": None, "units_sold": 6, "revenue": 150}]
+
+def test_streaming_export_ndjson_and_csv(client, monkeypatch):
+    # küçük parça boyutu ile birden fazla parça halinde akış denenir
+    monkeypatch.setattr(settings, "export_chunk_size", 2)
+    user_id = client.post("/users/", json={"username": "exp", "email": "exp@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Exp"}).json()["id"]
+    ids = client.post("/products/bulk", json=[{"name": f"E{i}", "price": i + 1, "category_id": cat_id}
+                                              for i in range(5)]).json()["ids"]
+    first = client.post("/orders/", json={"user_id": user_id,
+                                          "items": [{"product_id": ids[0], "quantity": 2},
+                                                    {"product_id": ids[1], "quantity": 1}]}).json()["id"]
+    empty = client.post("/orders/", json={"user_id": user_id}).json()["id"]
+
+    response = client.get("/products/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ids
+    assert lines[0] == {"id": ids[0], "name": "E0", "price": 1, "category_id": cat_id}
+
+    response = client.get("/orders/export", params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "order_id,user_id,status,total,product_id,quantity,unit_price",
+        f"{first},{user_id},pending,4,{ids[0]},2,1",
+        f"{first},{user_id},pending,4,{ids[1]},1,2",
+        f"{empty},{user_id},pending,0,,,",
+    ]
+    assert client.get("/users/export", params={"format": "csv"}).text.splitlines()[1] == f"{user_id},exp,exp@example.com"
+    assert client.get("/users/export", params={"format": "xml"}).status_code == 422
+
+def test_streaming_import_with_line_errors(client):
+    cat_id = client.post("/categories/", json={"name": "Imp"}).json()["id"]
+    user_id = client.post("/users/", json={"username": "imp", "email": "imp@example.com"}).json()["id"]
+    body = (f"name,price,category_id\nA,10,{cat_id}\nB,fiyat,{cat_id}\nC,30,9999\nD,40,{cat_id}\n").encode()
+
+    def chunks():
+        # gövde satır ortasından bölünmüş parçalar halinde gelir
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    response = client.post("/imports/products", params={"chunk_size": 2}, content=chunks(),
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    job = response.json()
+    assert (job["status"], job["line"], job["imported"], job["failed"]) == ("completed", 5, 2, 2)
+    errors = client.get(f"/imports/{job['id']}/errors").json()
+    assert [(e["line"], e["detail"].split(":")[0]) for e in errors] == [(3, "price"), (4, "Kategori bulunamadı")]
+    assert [p["name"] for p in client.get("/products/").json()] == ["A", "D"]
+
+    # siparişler dışa aktarım biçimindeki CSV'den order_id'ye göre gruplanarak eklenir
+    ids = [p["id"] for p in client.get("/products/").json()]
+    orders_csv = (f"order_id,user_id,product_id,quantity\n1,{user_id},{ids[0]},2\n1,{user_id},{ids[1]},1\n"
+                  f"2,{user_id},{ids[1]},3\n")
+    job = client.post("/imports/orders", content=orders_csv, headers={"Content-Type": "text/csv"}).json()
+    assert (job["imported"], job["failed"]) == (2, 0)
+    assert [o["total"] for o in client.get("/orders/").json()] == [60, 120]
+
+    assert client.post("/imports/users", params={"job_id": job["id"]}, content="").status_code == 409
+    assert client.get("/imports/9999").status_code == 404
+
+def test_fast_serialization_matches_response_model_bytes(client, monkeypatch):
+    # hızlı yol açık ve kapalıyken liste cevapları ve header'lar bayt bayt aynı olmalı
+    user_id = client.post("/users/", json={"username": "hızlı", "email": "fast@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Çay & \"Kahve\""}).json()["id"]
+    products = client.post("/products/bulk", json=[{"name": "Şeker", "price": 12, "category_id": cat_id},
+                                                   {"name": "Ürün ", "price": 7.5, "category_id": cat_id},
+                                                   {"name": "Z", "price": 3, "category_id": cat_id}]).json()["ids"]
+    client.delete(f"/categories/{cat_id}")  # category_id null olan ürünler
+    client.post("/reviews/", json={"text": "güzel", "product_id": products[0]})
+    client.post("/orders/", json={"user_id": user_id, "items": [{"product_id": products[2], "quantity": 2},
+                                                                {"product_id": products[0], "quantity": 1}]})
+    client.post("/orders/", json={"user_id": user_id})
+
+    urls = ["/users/", "/categories/", "/reviews/", "/orders/", "/products/?limit=2",
+            "/products/?sort=-price&limit=2", "/products/?sort=name"]
+    for url in urls:
+        monkeypatch.setattr(settings, "fast_serialization", False)
+        normal = client.get(url)
+        monkeypatch.setattr(settings, "fast_serialization", True)
+        fast = client.get(url)
+        assert fast.status_code == normal.status_code == 200
+        assert fast.content == normal.content, url
+        for header in ("content-type", "etag", "x-next-cursor"):
+            assert fast.headers.get(header) == normal.headers.get(header), (url, header)
+
+def test_sparse_fieldsets_limit_select_and_output(client, query_counter):
+    user_id = client.post("/users/", json={"username": "alan", "email": "alan@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Alan"}).json()["id"]
+    ids = client.post("/products/bulk", json=[{"name": "Pahalı", "price": 90, "category_id": cat_id},
+                                              {"name": "Ucuz", "price": 10, "category_id": cat_id}]).json()["ids"]
+    order_id = client.post("/orders/", json={"user_id": user_id, "product_ids": ids}).json()["id"]
+
+    assert client.get("/users/", params={"fields": "id,username"}).json() == [{"username": "alan", "id": user_id}]
+    assert client.get(f"/users/{user_id}", params={"fields": "email"}).json() == {"email": "alan@example.com"}
+    assert client.get("/users/", params={"ids": str(user_id), "fields": "username"}).json() == [{"username": "alan"}]
+
+    # sıralama kolonu seçilmese de cursor üretilir
+    page = client.get("/products/", params={"fields": "name", "sort": "price", "limit": 1})
+    assert page.json() == [{"name": "Ucuz"}]
+    next_page = client.get("/products/", params={"fields": "name", "sort": "price", "limit": 1,
+                                                  "cursor": page.headers["X-Next-Cursor"]})
+    assert next_page.json() == [{"name": "Pahalı"}]
+
+    query_counter.clear()
+    response = client.get("/orders/", params={"fields": "id,products.name"})
+    assert response.json() == [{"id": order_id, "products": [{"name": "Pahalı"}, {"name": "Ucuz"}]}]
+    selects = [s for s in query_counter if "table_versions" not in s]
+    assert "total" not in selects[0] and "price" not in selects[1] and "quantity" not in selects[1]
+
+    query_counter.clear()
+    assert client.get(f"/orders/{order_id}", params={"fields": "total"}).json() == {"total": 100}
+    # kalemler ve ürünler istenmediğinde ikinci sorgu atılmaz
+    assert len([s for s in query_counter if "table_versions" not in s]) == 1
+
+    assert client.get("/users/", params={"fields": "id,password"}).status_code == 400
+    assert client.get("/orders/", params={"fields": "total.value"}).status_code == 400
+
+
+def test_columnar_list_format(client):
+    user_id = client.post("/users/", json={"username": "sutun", "email": "sutun@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Sütun"}).json()["id"]
+    ids = client.post("/products/bulk", json=[{"name": "A", "price": 10, "category_id": cat_id},
+                                              {"name": "B", "price": 5, "category_id": cat_id}]).json()["ids"]
+    first = client.post("/orders/", json={"user_id": user_id, "product_ids": ids}).json()["id"]
+    second = client.post("/orders/", json={"user_id": user_id, "product_ids": [ids[0]]}).json()["id"]
+
+    response = client.get("/orders/", params={"format": "columnar"})
+    assert response.headers["content-type"] == "application/vnd.columnar+json"
+    assert "ETag" in response.headers
+    body = response.json()
+    assert body["columns"] == ["user_id", "id", "products", "items", "total"]
+    assert body["rows"] == [
+        [user_id, first, ids, [[ids[0], 1, 10.0], [ids[1], 1, 5.0]], 15.0],
+        [user_id, second, [ids[0]], [[ids[0], 1, 10.0]], 10.0],
+    ]
+    # ilk üründen iki siparişte de bahsedilir ama yan tabloda bir kez yer alır
+    assert body["tables"]["products"] == {
+        "columns": ["name", "price", "category_id", "id"],
+        "rows": [["A", 10.0, cat_id, ids[0]], ["B", 5.0, cat_id, ids[1]]],
+    }
+    assert body["nested"] == {"items": ["product_id", "quantity", "unit_price"]}
+
+    # Accept header'ı ve fields= ile birlikte; yan tablo anahtarı olarak ürün id'si eklenir
+    response = client.get("/orders/", params={"fields": "id,products.name"},
+                          headers={"Accept": "application/vnd.columnar+json"})
+    body = response.json()
+    assert body["columns"] == ["id", "products"]
+    assert body["rows"] == [[first, ids], [second, [ids[0]]]]
+    assert body["tables"]["products"] == {"columns": ["name", "id"], "rows": [["A", ids[0]], ["B", ids[1]]]}
+
+    users = client.get("/users/", params={"format": "columnar", "fields": "username"}).json()
+    assert users == {"columns": ["username"], "rows": [["sutun"]], "tables": {}, "nested": {}}
+    nested = client.get(f"/users/{user_id}/orders", params={"format": "columnar", "limit": 1})
+    assert nested.json()["rows"] == [[user_id, first, ids, [[ids[0], 1, 10.0], [ids[1], 1, 5.0]], 15.0]]
+    assert "X-Next-Cursor" in nested.headers
+
+
+def test_list_etag_depends_on_format(client):
+    client.post("/categories/", json={"name": "Format"})
+    plain = client.get("/categories/")
+    etag = plain.headers["ETag"]
+    assert etag.endswith('-json"') and plain.headers["Vary"] == "Accept"
+
+    # JSON cevabının ETag'i sütunlu cevap için geçerli sayılmaz
+    columnar = client.get("/categories/", headers={"Accept": "application/vnd.columnar+json", "If-None-Match": etag})
+    assert columnar.status_code == 200 and columnar.headers["ETag"] == etag.replace("-json", "-columnar")
+    assert columnar.headers["Vary"] == "Accept"
+    cached = client.get("/categories/", headers={"Accept": "application/vnd.columnar+json",
+                                                 "If-None-Match": columnar.headers["ETag"]})
+    assert cached.status_code == 304 and cached.headers["Vary"] == "Accept"
+    assert client.get("/categories/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_sql_instrumentation_headers_and_slow_query_log(client, query_counter, sql_instrumentation, caplog,
+                                                        monkeypatch):
+    user_id = client.post("/users/", json={"username": "olcum", "email": "olcum@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Ölçüm"}).json()["id"]
+    product_id = client.post("/products/", json={"name": "Ölçü", "price": 3, "category_id": cat_id}).json()["id"]
+
+    query_counter.clear()
+    response = client.post("/orders/", json={"user_id": user_id, "product_ids": [product_id]})
+    assert response.status_code == 201
+    assert int(response.headers["X-DB-Queries"]) == len(query_counter)
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+    monkeypatch.setattr(sql_instrumentation, "slow_query_ms", 0.0)
+    with caplog.at_level("WARNING", logger="app.sql"):
+        client.get("/orders/", params={"limit": 5})
+    entries = [json.loads(record.getMessage()) for record in caplog.records if record.name == "app.sql"]
+    select = next(entry for entry in entries if "FROM orders" in entry["statement"])
+    assert select["event"] == "slow_query" and select["path"] == "/orders/"
+    assert select["parameters"] == {"rows": 1, "types": ["int", "int"]}
+    assert select["duration_ms"] >= 0
+
+    monkeypatch.setattr(sql_instrumentation, "sql_instrumentation", False)
+    assert "X-DB-Queries" not in client.get("/orders/").headers
+
+
+def test_metrics_endpoint_reports_route_templates(client):
+    user_id = client.post("/users/", json={"username": "metrik", "email": "metrik@example.com"}).json()["id"]
+    client.get(f"/users/{user_id}")
+    client.get("/users/987654")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    # ham path değil route şablonu etiketlenir
+    assert f'route="/users/{user_id}"' not in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/users/{user_id}",le="+Inf"}' in text
+    assert 'http_responses_total{method="GET",route="/users/{user_id}",status="404"}' in text
+    assert 'http_responses_total{method="POST",route="/users/",status="201"}' in text
+    # /metrics isteğinin kendisi işlenirken sayılır
+    assert "http_requests_in_flight 1" in text
+    assert 'cache_hit_ratio{cache="entity"}' in text
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in text
+
+
+def test_profiling_capture_list_and_download(client, monkeypatch, tmp_path):
+    import pstats
+
+    monkeypatch.setattr(settings, "profile_token", "gizli")
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_keep", 2)
+    assert client.get("/profiles/").status_code == 403
+
+    client.post("/users/", json={"username": "profil", "email": "profil@example.com"})
+    assert client.get("/profiles/", headers={"X-Profile": "gizli"}).json() == []
+    for _ in range(3):
+        assert client.get("/users/", headers={"X-Profile": "gizli"}).status_code == 200
+
+    captures = client.get("/profiles/", headers={"X-Profile": "gizli"}).json()
+    # en yeni PROFILE_KEEP kayıt tutulur
+    assert len(captures) == 2 and len(list(tmp_path.iterdir())) == 4
+    capture = captures[0]
+    assert (capture["method"], capture["route"], capture["status"]) == ("GET", "/users/", 200)
+    assert any("FROM users" in query["statement"] for query in capture["statements"])
+
+    response = client.get(f"/profiles/{capture['id']}", headers={"X-Profile": "gizli"})
+    assert response.status_code == 200
+    path = tmp_path / "indirilen.prof"
+    path.write_bytes(response.content)
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    # worker thread'deki endpoint ve crud fonksiyonları da ölçülür
+    assert {"read_users", "get_users"} <= functions
+    assert client.get("/profiles/../../etc", headers={"X-Profile": "gizli"}).status_code == 404
+
+
+def test_group_commit_routes_return_results_and_errors(client, monkeypatch):
+    monkeypatch.setattr(settings, "group_commit_enabled", True)
+    user_id = client.post("/users/", json={"username": "grup", "email": "grup@example.com"}).json()["id"]
+    cat_id = client.post("/categories/", json={"name": "Grup"}).json()["id"]
+    product_id = client.post("/products/", json={"name": "Grup", "price": 4, "category_id": cat_id}).json()["id"]
+
+    response = client.post("/orders/", json={"user_id": user_id, "items": [{"product_id": product_id, "quantity": 2}]})
+    assert response.status_code == 201 and response.json()["total"] == 8
+    assert client.post("/orders/", json={"user_id": user_id, "product_ids": [999]}).status_code == 404
+    review = client.post("/reviews/", json={"text": "güzel", "product_id": product_id})
+    assert review.status_code == 201 and review.json()["text"] == "güzel"
+    assert [order["total"] for order in client.get("/orders/").json()] == [8]
+    assert "group_commit_batch_size_count" in client.get("/metrics").text
+
+
+
+def test_async_read_routes_serve_cache_hits_without_queries(client, monkeypatch, query_counter):
+    from app import crud
+    from app.cache import EntityCache
+
+    monkeypatch.setattr(settings, "entity_cache_enabled", True)
+    monkeypatch.setattr(crud, "entity_cache", EntityCache())
+    user_id = client.post("/users/", json={"username": "async", "email": "async@example.com"}).json()["id"]
+    first = client.get(f"/users/{user_id}")
+    assert first.status_code == 200
+
+    query_counter.clear()
+    second = client.get(f"/users/{user_id}")
+    # kayıt ve ETag sayacı önbellekten okunur, veritabanına gidilmez
+    assert second.json() == first.json() and second.headers["ETag"] == first.headers["ETag"]
+    assert query_counter == []
+    assert client.get(f"/users/{user_id}", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert client.get("/users/999").status_code == 404
+
+    metrics = client.get("/metrics").text
+    assert "db_executor_wait_seconds_count" in metrics and "db_executor_queue_depth 0" in metrics
+
+
+def test_admission_control_rejects_writes_and_keeps_reads(client, monkeypatch):
+    monkeypatch.setattr(settings, "client_rate_limit", 0.01)
+    monkeypatch.setattr(settings, "client_rate_burst", 2)
+    assert client.post("/categories/", json={"name": "Kabul 1"}).status_code == 201
+    assert client.post("/categories/", json={"name": "Kabul 2"}).status_code == 201
+    limited = client.post("/categories/", json={"name": "Kabul 3"})
+    # bir token 1/0.01 = 100 saniyede birikir
+    assert limited.status_code == 429 and limited.headers["Retry-After"] == "100"
+    assert client.get("/categories/").status_code == 200  # okumalar token harcamaz
+
+    monkeypatch.setattr(settings, "client_rate_limit", 0.0)
+    monkeypatch.setattr(settings, "admission_limits", "POST /categories/=0:0")
+    rejected = client.post("/categories/", json={"name": "Kabul 4"})
+    assert rejected.status_code == 503 and rejected.headers["Retry-After"] == "1"
+    assert client.post("/users/", json={"username": "kabul", "email": "kabul@example.com"}).status_code == 201
+    assert [category["name"] for category in client.get("/categories/").json()] == ["Kabul 1", "Kabul 2"]
+
+    metrics = client.get("/metrics").text
+    assert 'admission_rejected_total{route="/categories/",reason="queue_full"} 1' in metrics
+    assert 'admission_rejected_total{route="unlimited",reason="rate_limited"}' in metrics
+    assert 'http_responses_total{method="POST",route="/categories/",status="503"} 1' in metrics
+    assert 'admission_queue_depth{route="/categories/",method="POST"} 0' in metrics
+
+
+def test_profiling_failure_does_not_fail_request(client, monkeypatch, tmp_path):
+    import cProfile
+    from app import profiling
+
+    # Python 3.12+'daki gibi ikinci profiler (worker) açılamazsa istek yine başarılı olur, kayıt loop profiliyle yazılır
+    class SingleProfiler(cProfile.Profile):
+        active = False
+
+        def enable(self):
+            if SingleProfiler.active:
+                raise ValueError("Another profiling tool is already active")
+            SingleProfiler.active = True
+            super().enable()
+
+        def disable(self):
+            super().disable()
+            SingleProfiler.active = False
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", SingleProfiler)
+    monkeypatch.setattr(profiling, "SEPARATE_WORKER_PROFILE", True)
+    monkeypatch.setattr(settings, "profile_token", "gizli")
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    response = client.post("/categories/", json={"name": "Profil"}, headers={"X-Profile": "gizli"})
+    assert response.status_code == 201
+    assert client.get("/categories/", headers={"X-Profile": "gizli"}).status_code == 200
+    assert len(client.get("/profiles/", headers={"X-Profile": "gizli"}).json()) == 2
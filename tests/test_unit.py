@@ -1,8 +1,10 @@
 import pytest
 from sqlalchemy.orm import Session
 
-from app import models, schemas, crud
-
+from app import models, schemas, crud, importer
+from app.cache import EntityCache
+from app.database import create_db_engine
+from app.metrics import Histogram
 
 
 from app.utils import validate_email
@@ -108,6 +110,400 @@ def test_create_order_with_products_crud(db_session: Session):
     assert len(order.products) == 1
     assert order.products[0].name == "Keyboard"
 
+def test_bulk_create_categories_crud(db_session: Session):
+    result = crud.create_categories_bulk(db=db_session, categories=[
+        schemas.CategoryCreate(name="Books"), schemas.CategoryCreate(name="Music"),
+    ])
+    assert result.errors == []
+    assert [c.name for c in crud.get_categories(db_session)] == ["Books", "Music"]
+    assert [c.id for c in crud.get_categories(db_session)] == result.ids
+
+# Eşzamanlı istek yüzünden ön kontrolden kaçan çakışmada satırlar tek tek denenir; yine de hepsi tek transaction'dır
+def test_bulk_create_conflict_fallback_is_one_transaction(db_session: Session, monkeypatch):
+    crud.create_category(db_session, schemas.CategoryCreate(name="Books"))
+    monkeypatch.setattr(crud, "_mark_duplicates", lambda *args: None)
+
+    def fail(result):
+        assert result.ids[0] is not None and result.errors[0].index == 1
+        raise RuntimeError("ilerleme kaydı yazılamadı")
+
+    with pytest.raises(RuntimeError):
+        crud.create_categories_bulk(db_session, [schemas.CategoryCreate(name="Music"),
+                                                 schemas.CategoryCreate(name="Books")], before_commit=fail)
+    db_session.rollback()
+    assert [c.name for c in crud.get_categories(db_session)] == ["Books"]
+
+# ÖNBELLEK LRU + TTL davranışı ve crud katmanındaki geçersiz kılma kontrolleri
+def test_entity_cache_lru_and_ttl():
+    now = [0.0]
+    cache = EntityCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # en az kullanılan "b" düşer
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2, "evictions": 1, "expirations": 1}
+
+def test_entity_cache_skips_fill_after_write():
+    cache = EntityCache()
+    epoch = cache.epoch
+    cache.invalidate("a")  # okuma sürerken yazma oldu
+    cache.fill("a", "eski", epoch)
+    assert cache.get("a") is None
+
+def test_crud_cache_invalidated_on_update(db_session: Session, monkeypatch):
+    monkeypatch.setattr(crud.settings, "entity_cache_enabled", True)
+    monkeypatch.setattr(crud, "entity_cache", EntityCache())
+    cat = crud.create_category(db=db_session, category=schemas.CategoryCreate(name="Cat"))
+    prod = crud.create_product(db=db_session, product=schemas.ProductCreate(name="Old", price=1, category_id=cat.id))
+
+    assert crud.get_product(db=db_session, product_id=prod.id).name == "Old"
+    assert crud.entity_cache.hits == 1
+
+    crud.update_product(db=db_session, product_id=prod.id,
+                        product_update=schemas.ProductUpdate(name="New", price=2, category_id=cat.id))
+    assert crud.get_product(db=db_session, product_id=prod.id).name == "New"
+
+    crud.delete_category(db=db_session, category_id=cat.id)
+    assert crud.get_category(db=db_session, category_id=cat.id) is None
+    assert crud.get_product(db=db_session, product_id=prod.id).category_id is None
+
+def test_get_many_uses_cache_for_known_ids(db_session: Session, monkeypatch, query_counter):
+    monkeypatch.setattr(crud.settings, "entity_cache_enabled", True)
+    monkeypatch.setattr(crud, "entity_cache", EntityCache())
+    result = crud.create_users_bulk(db=db_session, users=[
+        schemas.UserCreate(username=f"u{i}", email=f"u{i}@example.com") for i in range(3)
+    ])
+    crud.get_user(db=db_session, user_id=result.ids[0])  # önbelleğe alınır
+
+    query_counter.clear()
+    users = crud.get_users_by_ids(db=db_session, ids=[result.ids[2], result.ids[0], 999])
+    assert [u.username for u in users] == ["u2", "u0"]
+    # önbellekteki kullanıcı IN listesine girmez
+    assert len(query_counter) == 1 and query_counter[0].count("?") == 2
+
+def test_rebuild_product_facets_matches_incremental_counts(db_session: Session):
+    cat = crud.create_category(db=db_session, category=schemas.CategoryCreate(name="Facet"))
+    prod = crud.create_product(db=db_session, product=schemas.ProductCreate(name="A", price=50, category_id=cat.id))
+    crud.create_product(db=db_session, product=schemas.ProductCreate(name="B", price=700, category_id=cat.id))
+    crud.update_product(db=db_session, product_id=prod.id, product_update=schemas.ProductUpdate(price=1500))
+    incremental = crud.get_product_facets(db=db_session)
+
+    version = crud.get_table_version(db_session, "products")
+    crud.rebuild_product_facets(db=db_session)
+    assert crud.get_product_facets(db=db_session) == incremental
+    assert crud.get_table_version(db_session, "products") == version + 1  # facets ETag'i değişir
+    crud.rebuild_analytics(db=db_session)
+    assert crud.get_table_version(db_session, "products") == version + 2
+    assert [b.min_price for b in incremental.price_buckets] == [500, 1000]
+
+
+def test_product_facets_exclude_prices_below_first_bucket(db_session: Session, monkeypatch):
+    monkeypatch.setattr(crud.settings, "facet_price_buckets", "100,500")
+    cat = crud.create_category(db=db_session, category=schemas.CategoryCreate(name="Facet"))
+    for name, price in (("A", 50), ("B", 150), ("C", 600)):
+        crud.create_product(db=db_session, product=schemas.ProductCreate(name=name, price=price, category_id=cat.id))
+    # min_price ilk sınıra eşit: sayaç tablosundan okunur ama 50'lik ürün sayılmaz (SQL yolu ile aynı sonuç)
+    counted = crud.get_product_facets(db_session, schemas.ProductFilter(min_price=100))
+    filtered = crud.get_product_facets(db_session, schemas.ProductFilter(min_price=100, max_price=10 ** 9))
+    assert [(b.min_price, b.count) for b in counted.price_buckets] == [(100, 1), (500, 1)]
+    assert counted == filtered and counted.categories[0].count == 2
+    # filtresiz cevapta alt sınırın altındaki ürün alt sınırı olmayan ayrı bir aralıktır
+    assert [(b.min_price, b.max_price, b.count) for b in crud.get_product_facets(db_session).price_buckets] == [
+        (None, 100, 1), (100, 500, 1), (500, None, 1)]
+def test_rebuild_analytics_matches_incremental_tables(db_session: Session):
+    user = crud.create_user(db=db_session, user=schemas.UserCreate(username="an", email="an@example.com"))
+    cat = crud.create_category(db=db_session, category=schemas.CategoryCreate(name="An"))
+    prod = crud.create_product(db=db_session, product=schemas.ProductCreate(name="P", price=20, category_id=cat.id))
+    crud.create_order(db=db_session, order=schemas.OrderCreate(
+        user_id=user.id, items=[schemas.OrderItemCreate(product_id=prod.id, quantity=2)]))
+    crud.create_review(db=db_session, review=schemas.ReviewCreate(text="ok", product_id=prod.id))
+    incremental = (crud.get_product_stats(db_session, prod.id), crud.get_category_revenue(db_session))
+
+    crud.rebuild_analytics(db=db_session)
+    assert (crud.get_product_stats(db_session, prod.id), crud.get_category_revenue(db_session)) == incremental
+    assert incremental[0].revenue == 40 and incremental[0].review_count == 1
+
+def test_import_resumes_from_last_committed_chunk(db_session: Session):
+    lines = [f'{{"name": "Kat{i}"}}\n' for i in range(5)]
+
+    def interrupted():
+        yield from lines[:3]
+        raise RuntimeError("bağlantı koptu")
+
+    with pytest.raises(RuntimeError):
+        importer.run_import(db_session, "categories", interrupted(), chunk_size=2)
+    job = crud.get_import_jobs(db_session)[0]
+    # ilk parça (2 satır) commit edildi, üçüncü satır geri alındı
+    assert (job.status, job.line, job.imported) == ("failed", 2, 2)
+
+    job = importer.run_import(db_session, "categories", iter(lines), job_id=job.id, chunk_size=2)
+    assert (job.status, job.line, job.imported, job.failed) == ("completed", 5, 5, 0)
+    assert [c.name for c in crud.get_categories(db_session)] == [f"Kat{i}" for i in range(5)]
+
+def test_import_releases_writer_connection_between_chunks(tmp_path):
+    from sqlalchemy.orm import sessionmaker
+
+    writer = create_db_engine(f"sqlite:///{tmp_path / 'import.db'}", "production", pool_size=1, max_overflow=0,
+                              name="write")
+    models.Base.metadata.create_all(bind=writer)
+    db = sessionmaker(bind=writer, autoflush=False)()
+    checked_out = []
+
+    def lines():
+        for i in range(5):
+            # girdi beklenirken (yavaş yükleme) yazıcı bağlantısı havuzda olmalı
+            checked_out.append(writer.pool.checkedout())
+            yield f'{{"name": "Kat{i}"}}\n'
+
+    job = importer.run_import(db, "categories", lines(), chunk_size=2)
+    assert (job.status, job.imported) == ("completed", 5)
+    assert checked_out == [0] * 5
+    db.close()
+
+def test_histogram_merges_per_thread_shards():
+    import threading
+
+    histogram = Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1.0))
+
+    def observe():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, "/orders/{order_id}")
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert histogram.render() == [
+        'test_seconds_bucket{route="/orders/{order_id}",le="0.1"} 4',
+        'test_seconds_bucket{route="/orders/{order_id}",le="1.0"} 8',
+        'test_seconds_bucket{route="/orders/{order_id}",le="+Inf"} 12',
+        'test_seconds_sum{route="/orders/{order_id}"} 22.2',
+        'test_seconds_count{route="/orders/{order_id}"} 12',
+    ]
+
+def test_production_engine_profile_pragmas_and_read_only_pool(tmp_path):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    url = f"sqlite:///{tmp_path / 'profil.db'}"
+    writer = create_db_engine(url, "production", "cache_size=-1000", pool_size=1, max_overflow=0, name="write")
+    reader = create_db_engine(url, "production", read_only=True, name="read")
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -1000  # SQLITE_PRAGMAS profili ezer
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    assert writer.pool.size() == 1
+
+    # WAL: açık bir yazma transaction'ı varken okuyucu beklemeden son commit edilen veriyi okur
+    with writer.begin() as conn:
+        conn.execute(text("INSERT INTO t VALUES (2)"))
+        with reader.connect() as read_conn:
+            assert read_conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+    with reader.connect() as read_conn:
+        with pytest.raises(OperationalError):
+            read_conn.execute(text("INSERT INTO t VALUES (3)"))
+    with pytest.raises(ValueError):
+        create_db_engine(url, "bilinmeyen")
+
+def _metric_value(metric, suffix):
+    line = next(line for line in metric.render() if line.startswith(metric.name + suffix))
+    return float(line.rsplit(" ", 1)[1])
+
+def test_group_commit_batches_concurrent_writes(db_session):
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy.orm import sessionmaker
+    from app.group_commit import BATCH_SIZE, GroupCommitter
+
+    category = crud.create_category(db_session, schemas.CategoryCreate(name="Grup"))
+    product = crud.create_product(db_session, schemas.ProductCreate(name="Grup", price=5, category_id=category.id))
+    committer = GroupCommitter(sessionmaker(bind=db_session.get_bind(), expire_on_commit=False),
+                               window=1.0, max_batch=4)
+    version = crud.get_table_version(db_session, "reviews")
+    batches, written = _metric_value(BATCH_SIZE, "_count"), _metric_value(BATCH_SIZE, "_sum")
+
+    def write(index):
+        if index == 2:
+            return committer.submit(crud.create_order, order=schemas.OrderCreate(user_id=1, product_ids=[999]))
+        review = schemas.ReviewCreate(text=f"yorum {index}", product_id=product.id)
+        return committer.submit(crud.create_review, review=review)
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(write, index) for index in range(4)]
+    # hatalı iş sadece kendi çağıranına hata döner, diğerleri aynı commit ile yazılır
+    assert isinstance(futures[2].exception(), crud.MissingProductsError)
+    reviews = sorted((futures[index].result() for index in (0, 1, 3)), key=lambda review: review.id)
+    assert [review.text for review in reviews] == ["yorum 0", "yorum 1", "yorum 3"]
+    assert (_metric_value(BATCH_SIZE, "_count"), _metric_value(BATCH_SIZE, "_sum")) == (batches + 1, written + 4)
+    assert crud.get_table_version(db_session, "reviews") == version + 1
+    assert len(crud.get_reviews(db_session)) == 3
+
+def test_db_executor_rejects_when_queue_is_full():
+    import asyncio
+    from fastapi import HTTPException
+    from app.executor import DBExecutor
+
+    async def scenario():
+        assert await DBExecutor(workers=1, max_queue=1).run(lambda value: value * 2, 21) == 42
+        with pytest.raises(HTTPException) as full:
+            await DBExecutor(workers=1, max_queue=0).run(lambda: None)
+        with pytest.raises(HTTPException) as late:
+            # başlamadan önce beklemesi gereken süre aşılmış iş çalıştırılmaz
+            await DBExecutor(workers=1, max_queue=1, max_wait=-1).run(lambda: pytest.fail("çalışmamalı"))
+        return full.value, late.value
+
+    for error in asyncio.run(scenario()):
+        assert error.status_code == 503 and error.headers == {"Retry-After": "1"}
+
+def test_admission_limiter_queue_and_token_bucket():
+    import asyncio
+    from app.admission import Limiter, Rejected, TokenBucket, parse_limits
+
+    assert parse_limits("post /orders/=4:32, GET /users/{user_id}=2") == {
+        ("POST", "/orders/"): (4, 32), ("GET", "/users/{user_id}"): (2, 0)}
+    with pytest.raises(ValueError):
+        parse_limits("POST=4:32")
+
+    async def scenario():
+        limiter = Limiter(concurrency=1, queue=1)
+        assert await limiter.acquire(None) == 0.0
+        waiting = asyncio.ensure_future(limiter.acquire(None))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as full:
+            await limiter.acquire(None)  # kuyruk dolu: beklemeden reddedilir
+        limiter.release()  # yer kuyruktaki isteğe devredilir
+        await waiting
+        assert (limiter.active, limiter.depth()) == (1, 0)
+        with pytest.raises(Rejected) as late:
+            await limiter.acquire(0.01)
+        limiter.release()
+        return full.value, late.value, limiter
+
+    full, late, limiter = asyncio.run(scenario())
+    assert (full.status_code, full.reason) == (503, "queue_full")
+    assert (late.status_code, late.reason, late.retry_after) == (503, "queue_timeout", 1)
+    assert (limiter.active, limiter.depth()) == (0, 0)
+
+    bucket = TokenBucket(rate=2, burst=2, now=0.0)
+    assert bucket.take(0.0) == 0.0 and bucket.take(0.0) == 0.0
+    assert bucket.take(0.0) == 0.5
+    assert bucket.take(0.5) == 0.0
+
+def test_query_timing_survives_failing_statements(db_session: Session, sql_instrumentation):
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+    from app import instrumentation, profiling
+
+    crud.create_category(db_session, schemas.CategoryCreate(name="Books"))
+    stats = instrumentation.QueryStats("/test")
+    capture = profiling.Capture("GET", "/test")
+    tokens = instrumentation._current.set(stats), profiling._current.set(capture)
+    profiling.event.listen(profiling.Engine, "before_cursor_execute", profiling._before_cursor_execute)
+    profiling.event.listen(profiling.Engine, "after_cursor_execute", profiling._after_cursor_execute)
+    try:
+        with pytest.raises(IntegrityError):
+            db_session.execute(insert(models.Category).values(name="Books"))
+        db_session.rollback()
+        assert [c.name for c in crud.get_categories(db_session)] == ["Books"]
+        info = db_session.connection().info
+    finally:
+        profiling.event.remove(profiling.Engine, "before_cursor_execute", profiling._before_cursor_execute)
+        profiling.event.remove(profiling.Engine, "after_cursor_execute", profiling._after_cursor_execute)
+        instrumentation._current.reset(tokens[0])
+        profiling._current.reset(tokens[1])
+    # hata veren INSERT sayılmaz ve havuzdaki bağlantıda başlangıç zamanı artığı kalmaz
+    assert stats.count == 1 and len(capture.statements) == 1
+    assert "query_start" not in info and "profile_start" not in info
+
+def test_async_read_session_closed_when_executor_rejects(monkeypatch):
+    import asyncio
+    from sqlalchemy import text
+    from app import database
+    from app.executor import DBExecutor
+
+    # kuyruk sınırı 0: executor her işi 503 ile reddeder, teardown'daki close da dahil
+    monkeypatch.setattr(database, "db_executor", DBExecutor(workers=1, max_queue=0))
+    pool = database.read_engine.pool
+    checked_out = pool.checkedout()
+
+    async def scenario():
+        dependency = database.get_async_read_db()
+        db = await dependency.__anext__()
+        db.execute(text("SELECT 1"))
+        assert pool.checkedout() == checked_out + 1
+        with pytest.raises(StopAsyncIteration):
+            await dependency.__anext__()
+
+    asyncio.run(scenario())
+    assert pool.checkedout() == checked_out
+
+# İlk sürümün şemasıyla oluşturulmuş veritabanı (sipariş kalemi ve toplam kolonları yok)
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, email VARCHAR NOT NULL UNIQUE)",
+    "CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE)",
+    "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, price INTEGER NOT NULL, "
+    "category_id INTEGER REFERENCES categories (id))",
+    "CREATE TABLE reviews (id INTEGER PRIMARY KEY, text VARCHAR NOT NULL, product_id INTEGER REFERENCES products (id))",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users (id), status VARCHAR)",
+    "CREATE TABLE order_product (order_id INTEGER REFERENCES orders (id), product_id INTEGER REFERENCES products (id))",
+    "INSERT INTO users VALUES (1, 'eski', 'eski@example.com')",
+    "INSERT INTO products VALUES (1, 'Kalem', 10, NULL), (2, 'Defter', 25, NULL)",
+    "INSERT INTO reviews VALUES (1, 'eski yorum', 1)",
+    "INSERT INTO orders VALUES (1, 1, 'pending')",
+    "INSERT INTO order_product VALUES (1, 1), (1, 2)",
+]
+
+def test_migrate_upgrades_baseline_database(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import migrations
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'eski.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+    applied = migrations.upgrade(engine)
+    assert "orders.total eklendi ve kalemlerden dolduruldu" in applied
+    assert "products_fts oluşturuldu ve mevcut kayıtlar index'lendi" in applied
+    assert migrations.upgrade(engine) == []  # ikinci çalıştırmada yapılacak iş kalmaz
+
+    with sessionmaker(bind=engine)() as db:
+        order = crud.get_orders(db)[0]
+        assert order.total == 35
+        assert [(item.product_id, item.quantity, item.unit_price) for item in order.items] == [(1, 1, 10), (2, 1, 25)]
+        # arama index'i mevcut kayıtlarla doldurulur ve sonraki yazmaları trigger'lar takip eder
+        assert [p.name for p, _ in crud.search_products(db, "kalem")] == ["Kalem"]
+        assert [r.text for r, _ in crud.search_reviews(db, "yorum")] == ["eski yorum"]
+        category = crud.create_category(db, schemas.CategoryCreate(name="Kırtasiye"))
+        crud.create_product(db, schemas.ProductCreate(name="Kalemlik", price=5, category_id=category.id))
+        assert [p.name for p, _ in crud.search_products(db, "kalemlik")] == ["Kalemlik"]
+
+def test_admission_timeout_after_handover_releases_slot(monkeypatch):
+    import asyncio
+    from app.admission import Limiter, Rejected
+
+    limiter = Limiter(concurrency=1, queue=1)
+
+    # 3.12+ davranışı: yer bekleyene devredildiği turda zaman aşımı da tetiklenir
+    async def handover_then_timeout(waiter, timeout):
+        limiter.release()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        await limiter.acquire(None)
+        monkeypatch.setattr(asyncio, "wait_for", handover_then_timeout)
+        with pytest.raises(Rejected):
+            await limiter.acquire(0.01)
+
+    asyncio.run(scenario())
+    assert (limiter.active, limiter.depth()) == (0, 0)
+
 # NEGATİF / Basit Manuel Kontroller
 # burada temel mantıksal kontroller yapıldı (örneğim eposta doğrulaması) format kontrolü
 def test_manual_validation_email():
@@ -117,5 +513,3 @@ def test_manual_validation_email():
 def test_manual_price_positive():
     assert 5000 > 0
     assert -100 < 0
-
-